@@ -17,22 +17,43 @@ from plotly.subplots import make_subplots
 
 # Statistical and ML libraries
 from scipy import stats
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
+from cube import load_cube, slice_labels
+from bootstrap import cagr_interval, share_intervals, yoy_interval
+from contributions import load_contribution_cube, top_movers
+from decomposition import load_decomposition
+from geography import DIMENSION_TABLE, GeoDimension
+from indexes import load_prefix_sum_index
+from insight_rules import DEFAULT_RULES, default_catalog, evaluate_rules
+from modeling import forecast_spending, segment_customers
+from pivot import PivotEngine
+from sampling import StratifiedSample, choose_mode, exact_groups
+from significance import significance_table
+from sketches import load_heavy_hitters, load_slice_sketches
+from time_pyramid import TimePyramid, load_time_pyramid
+from window_metrics import load_window_metrics
+
 class CreditCardAnalyzer:
     """
     Comprehensive analyzer for credit card spending data
     """
 
-    def __init__(self, main_data_path, detailed_data_path):
-        """Initialize the analyzer with data paths"""
+    def __init__(self, main_data_path, detailed_data_path, mode='exact', sample_fraction=0.1,
+                 geo_dimension_path=DIMENSION_TABLE):
+        """Initialize the analyzer with data paths and execution mode ('exact', 'approximate' or 'auto')"""
+        self.main_data_path = main_data_path
+        self.detailed_data_path = detailed_data_path
+        self.geo_dimension_path = geo_dimension_path
+        self._geography = None
+        self.sample_fraction = sample_fraction
+        self._sample = None
+        self._main_pyramid = None
+        self._pivot_engine = None
         self.main_df = pd.read_csv(main_data_path)
         self.detailed_df = pd.read_csv(detailed_data_path)
 
@@ -40,9 +61,58 @@ class CreditCardAnalyzer:
         self.main_df['Date'] = pd.to_datetime(self.main_df['Date'])
         self.detailed_df['Date'] = pd.to_datetime(self.detailed_df['Date'])
 
+        self.mode = choose_mode(mode, len(self.detailed_df))
+
         print("✅ Data loaded successfully!")
         print(f"Main dataset: {self.main_df.shape}")
         print(f"Detailed dataset: {self.detailed_df.shape}")
+        print(f"Execution mode: {self.mode}")
+
+    @property
+    def approximate(self):
+        return self.mode == 'approximate'
+
+    @property
+    def geography(self):
+        """City -> State / Region / Tier dimension table"""
+        if self._geography is None:
+            self._geography = GeoDimension.from_csv(self.geo_dimension_path)
+        return self._geography
+
+    def _group_spending(self, dimension):
+        """Sum, mean and share of spending per group, from the stratified sample in approximate mode
+
+        State, Region and Tier are rolled up from City through the geography dimension table.
+        """
+        rollup = dimension not in self.detailed_df.columns
+        if not self.approximate:
+            if rollup:
+                city_groups = exact_groups(self.detailed_df, 'Spending_Amount_Thousands_INR', 'City')
+                return self.geography.rollup(city_groups, dimension)
+            return exact_groups(self.detailed_df, 'Spending_Amount_Thousands_INR', dimension)
+        if self._sample is None:
+            self._sample = StratifiedSample(self.detailed_df, fraction=self.sample_fraction)
+        groups = self.geography.codes(self._sample.sample['City'], dimension) if rollup else None
+        return self._sample.estimate_groups('Spending_Amount_Thousands_INR', dimension, groups=groups)
+
+    @property
+    def main_pyramid(self):
+        """Month, quarter, financial-year and calendar-year aggregates of the main dataset"""
+        if self._main_pyramid is None:
+            self._main_pyramid = TimePyramid.from_frame(self.main_df)
+        return self._main_pyramid
+
+    @property
+    def pivot_engine(self):
+        """Cross-tabs of any dimensions (geographic levels included) from the leaf-slice prefix sums"""
+        if self._pivot_engine is None:
+            index = load_prefix_sum_index(self.detailed_df, self.detailed_data_path)
+            self._pivot_engine = PivotEngine(index, self.geography)
+        return self._pivot_engine
+
+    def _margin(self, value):
+        """' ±x' suffix for approximate answers"""
+        return f" ±{value:.1f}" if self.approximate else ""
 
     def statistical_summary(self):
         """Generate comprehensive statistical summary"""
@@ -55,11 +125,9 @@ class CreditCardAnalyzer:
         print(self.main_df[['Total_Spending_Billion_INR', 'Active_Cards_Millions', 'Avg_Monthly_Spend_INR']].describe())
 
         # Growth analysis
-        latest_year = self.main_df['Year'].max()
-        earliest_year = self.main_df['Year'].min()
-
-        latest_spending = self.main_df[self.main_df['Year'] == latest_year]['Total_Spending_Billion_INR'].sum()
-        earliest_spending = self.main_df[self.main_df['Year'] == earliest_year]['Total_Spending_Billion_INR'].sum()
+        yearly = self.main_pyramid.frame('Year', ['Total_Spending_Billion_INR'])
+        earliest_year, latest_year = yearly['Period'].iloc[0], yearly['Period'].iloc[-1]
+        earliest_spending, latest_spending = yearly['Total_Spending_Billion_INR'].iloc[[0, -1]]
         total_growth = ((latest_spending / earliest_spending) - 1) * 100
 
         print(f"\n📈 Overall Growth Analysis ({earliest_year}-{latest_year}):")
@@ -87,22 +155,69 @@ class CreditCardAnalyzer:
             month_name = pd.Timestamp(2024, month, 1).strftime('%B')
             print(f"{month_name}: ₹{spending:.1f}B")
 
-        # Year-over-year growth analysis
-        yearly_growth = self.main_df.groupby('Year').agg({
-            'Total_Spending_Billion_INR': 'sum',
-            'Active_Cards_Millions': 'mean'
-        })
+        # Year-over-year growth analysis (partial years have no growth figure)
+        yearly_growth = self.main_pyramid.frame(
+            'Year', ['Total_Spending_Billion_INR', 'Active_Cards_Millions']
+        ).set_index('Period').rename_axis('Year')
 
-        yearly_growth['Spending_Growth'] = yearly_growth['Total_Spending_Billion_INR'].pct_change() * 100
-        yearly_growth['Cards_Growth'] = yearly_growth['Active_Cards_Millions'].pct_change() * 100
+        yearly_growth['Spending_Growth'] = self.main_pyramid.growth('Total_Spending_Billion_INR', 'Year')
+        yearly_growth['Cards_Growth'] = self.main_pyramid.growth('Active_Cards_Millions', 'Year')
 
         print("\n📊 Year-over-Year Growth:")
         for year, row in yearly_growth.iterrows():
             if not np.isnan(row['Spending_Growth']):
                 print(f"{year}: Spending {row['Spending_Growth']:.1f}%, Cards {row['Cards_Growth']:.1f}%")
 
+        # Indian financial years run April to March
+        fiscal = self.main_pyramid.frame('Financial_Year', ['Total_Spending_Billion_INR'])
+        fiscal['Spending_Growth'] = self.main_pyramid.growth('Total_Spending_Billion_INR', 'Financial_Year')
+
+        print("\n📊 Financial-Year Growth (April-March):")
+        for _, row in fiscal.dropna(subset=['Spending_Growth']).iterrows():
+            print(f"{row['Period']}: ₹{row['Total_Spending_Billion_INR']:.1f}B, Spending {row['Spending_Growth']:.1f}%")
+
         return yearly_growth
 
+    def seasonal_decomposition(self):
+        """Decompose every Category/City/demographic series into trend, seasonality and residual"""
+        print("\n" + "="*60)
+        print("🌀 SEASONAL DECOMPOSITION")
+        print("="*60)
+
+        decomposition = load_decomposition(self.detailed_df, self.detailed_data_path)
+        table = decomposition.seasonal_table()
+        months = list(range(1, 13))
+        table['Slice'] = slice_labels(table, decomposition.dims)
+        table['Peak_Month'] = table[months].idxmax(axis=1)
+        table['Peak_Index'] = table[months].max(axis=1)
+
+        print("\n📅 Peak Seasonal Month by Series:")
+        for _, row in table.iterrows():
+            peak_month_name = pd.Timestamp(2024, row['Peak_Month'], 1).strftime('%B')
+            print(f"{row['Level']} - {row['Slice']}: {peak_month_name} (index {row['Peak_Index']:.2f})")
+
+        return decomposition
+
+    def growth_metrics(self):
+        """Latest MoM/YoY growth, rolling and YTD totals for every Category and City"""
+        print("\n" + "="*60)
+        print("📐 GROWTH & ROLLING METRICS")
+        print("="*60)
+
+        window_metrics = load_window_metrics(self.detailed_df, self.detailed_data_path)
+        latest_date = window_metrics.periods[-1]
+
+        for level in ['Category', 'City']:
+            snapshot = window_metrics.snapshot('Spending_Amount_Thousands_INR', level=level)
+            snapshot = snapshot.sort_values('YoY_Growth', ascending=False)
+
+            print(f"\n📊 {level} Metrics ({latest_date.strftime('%B %Y')}):")
+            for _, row in snapshot.iterrows():
+                print(f"{row[level]}: MoM {row['MoM_Growth']:.1f}%, YoY {row['YoY_Growth']:.1f}%, "
+                      f"3M Avg ₹{row['Rolling_Mean_3']/1000:.1f}M, YTD ₹{row['YTD']/1000:.1f}M")
+
+        return window_metrics
+
     def category_analysis(self):
         """Analyze spending patterns by category"""
         print("\n" + "="*60)  
@@ -110,16 +225,17 @@ class CreditCardAnalyzer:
         print("="*60)
 
         # Top categories
-        category_totals = self.detailed_df.groupby('Category')['Spending_Amount_Thousands_INR'].sum().sort_values(ascending=False)
-        total_spending = category_totals.sum()
+        category_spending = self._group_spending('Category').sort_values('sum', ascending=False)
+        category_totals = category_spending['sum']
 
         print("\n🏆 Top Categories by Total Spending:")
-        for i, (category, spending) in enumerate(category_totals.head(8).items(), 1):
-            percentage = (spending / total_spending) * 100
-            print(f"{i}. {category}: ₹{spending/1000:.1f}M ({percentage:.1f}%)")
+        for i, (category, row) in enumerate(category_spending.head(8).iterrows(), 1):
+            print(f"{i}. {category}: ₹{row['sum']/1000:.1f}M{self._margin(row['sum_ci']/1000)} "
+                  f"({row['percentage']:.1f}%{self._margin(row['percentage_ci'])})")
 
         # Category growth trends
-        category_yearly = self.detailed_df.groupby(['Year', 'Category'])['Spending_Amount_Thousands_INR'].sum().unstack(fill_value=0)
+        pyramid = load_time_pyramid(self.detailed_df, self.detailed_data_path)
+        category_yearly = pyramid.table('Spending_Amount_Thousands_INR', 'Year', 'Category')
         category_growth = category_yearly.pct_change() * 100
 
         print("\n📈 Category Growth (2024 vs 2023):")
@@ -138,74 +254,173 @@ class CreditCardAnalyzer:
         print("="*60)
 
         # Age group analysis
-        age_spending = self.detailed_df.groupby('Age_Group')['Spending_Amount_Thousands_INR'].agg(['mean', 'sum'])
-        age_spending['percentage'] = (age_spending['sum'] / age_spending['sum'].sum()) * 100
+        age_spending = self._group_spending('Age_Group')
 
         print("\n🎂 Spending by Age Group:")
         for age_group, row in age_spending.iterrows():
-            print(f"{age_group}: Avg ₹{row['mean']:.1f}K, Total Share {row['percentage']:.1f}%")
+            print(f"{age_group}: Avg ₹{row['mean']:.1f}K{self._margin(row['mean_ci'])}, "
+                  f"Total Share {row['percentage']:.1f}%{self._margin(row['percentage_ci'])}")
 
         # Gender analysis
-        gender_spending = self.detailed_df.groupby('Gender')['Spending_Amount_Thousands_INR'].agg(['mean', 'sum'])
-        gender_spending['percentage'] = (gender_spending['sum'] / gender_spending['sum'].sum()) * 100
+        gender_spending = self._group_spending('Gender')
 
         print("\n⚥ Spending by Gender:")
         for gender, row in gender_spending.iterrows():
-            print(f"{gender}: Avg ₹{row['mean']:.1f}K, Total Share {row['percentage']:.1f}%")
+            print(f"{gender}: Avg ₹{row['mean']:.1f}K{self._margin(row['mean_ci'])}, "
+                  f"Total Share {row['percentage']:.1f}%{self._margin(row['percentage_ci'])}")
 
         # Card type analysis
-        card_spending = self.detailed_df.groupby('Card_Type')['Spending_Amount_Thousands_INR'].agg(['mean', 'sum'])
-        card_spending['percentage'] = (card_spending['sum'] / card_spending['sum'].sum()) * 100
+        card_spending = self._group_spending('Card_Type')
 
         print("\n💳 Spending by Card Type:")
         for card_type, row in card_spending.iterrows():
-            print(f"{card_type}: Avg ₹{row['mean']:.1f}K, Total Share {row['percentage']:.1f}%")
+            print(f"{card_type}: Avg ₹{row['mean']:.1f}K{self._margin(row['mean_ci'])}, "
+                  f"Total Share {row['percentage']:.1f}%{self._margin(row['percentage_ci'])}")
 
-    def geographic_analysis(self):
-        """Analyze spending by geography"""
+    def cross_tab_analysis(self, rows='Age_Group', columns='Card_Type', pages='Region'):
+        """Card mix of each age group overall and per region, and its year-over-year growth"""
         print("\n" + "="*60)
-        print("🌍 GEOGRAPHIC ANALYSIS")
+        print("🧮 CROSS-TAB ANALYSIS")
         print("="*60)
 
-        # City-wise analysis
-        city_spending = self.detailed_df.groupby('City')['Spending_Amount_Thousands_INR'].agg(['mean', 'sum', 'count'])
-        city_spending['percentage'] = (city_spending['sum'] / city_spending['sum'].sum()) * 100
-        city_spending = city_spending.sort_values('sum', ascending=False)
+        engine = self.pivot_engine
+        measure = 'Spending_Amount_Thousands_INR'
+        end = engine.index.periods[-1]
+        start = (end - pd.DateOffset(years=1) + pd.Timedelta(days=1)).normalize()
 
-        print("\n🏙️ Top Cities by Total Spending:")
-        for i, (city, row) in enumerate(city_spending.head(8).iterrows(), 1):
-            print(f"{i}. {city}: ₹{row['sum']/1000:.1f}M ({row['percentage']:.1f}%), Avg: ₹{row['mean']:.1f}K")
+        mix = engine.pivot(measure, rows, columns, stat='share', normalize='index')
+        by_page = engine.pivot(measure, rows, columns, pages=pages, stat='share', normalize='index')
+        growth = engine.pivot(measure, rows, columns, stat='growth', start=start, end=end)
 
-    def customer_segmentation(self):
-        """Perform customer segmentation using clustering"""
+        print(f"\n📊 {columns} Share of Spending within each {rows} (%):")
+        print(mix.round(1).to_string())
+
+        # Largest gap between a page's mix and the overall mix
+        deviation = (by_page - mix.reindex(by_page.index, level=rows)).abs().stack()
+        (page, row, column), gap = deviation.idxmax(), deviation.max()
+        print(f"\n🔀 Largest {pages} deviation: {column} share among {row} in {page} "
+              f"differs by {gap:.1f} pts from the overall mix")
+
+        print(f"\n📈 YoY Growth by {rows} x {columns} ({start:%b %Y} - {end:%b %Y}, %):")
+        print(growth.round(1).to_string())
+
+        return {'mix': mix, 'mix_by_page': by_page, 'growth': growth}
+
+    def spending_percentiles(self):
+        """P50/P90/P99 of spending and transaction size per dimension from quantile sketches"""
         print("\n" + "="*60)
-        print("🎯 CUSTOMER SEGMENTATION")
+        print("📏 SPENDING PERCENTILES")
+        print("="*60)
+
+        sketches = load_slice_sketches(self.detailed_data_path)
+        tables = {}
+        for measure in ['Spending_Amount_Thousands_INR', 'Avg_Transaction_Amount_INR']:
+            tables[measure] = {}
+            for dimension in ['Category', 'City', 'Age_Group', 'Gender', 'Card_Type']:
+                table = sketches.percentile_table(measure, dimension)
+                tables[measure][dimension] = table
+                print(f"\n📊 {measure} by {dimension}:")
+                for name, row in table.iterrows():
+                    print(f"{name}: P50 {row['P50']:,.1f}, P90 {row['P90']:,.1f}, P99 {row['P99']:,.1f}")
+
+        return tables
+
+    def significance_analysis(self, alpha=0.05):
+        """Test whether demographic spending differences are significant in each Category x City slice"""
+        print("\n" + "="*60)
+        print("🧪 SIGNIFICANCE TESTING")
+        print("="*60)
+
+        results = significance_table(self.detailed_df, alpha=alpha)
+
+        summary = results.groupby(['Dimension', 'Test']).agg(
+            Slices=('Significant', 'size'),
+            Significant=('Significant', 'sum'),
+            Median_P=('P_Adjusted', 'median')
+        )
+
+        print(f"\n📋 Significant Differences (FDR-adjusted, alpha={alpha}):")
+        for (dimension, test), row in summary.iterrows():
+            print(f"{dimension} [{test}]: {int(row['Significant'])}/{int(row['Slices'])} slices, median adj. p = {row['Median_P']:.3g}")
+
+        return results
+
+    def geographic_analysis(self, level='City'):
+        """Analyze spending by geography at any level of the dimension table (City, State, Region, Tier)"""
+        print("\n" + "="*60)
+        print(f"🌍 GEOGRAPHIC ANALYSIS ({level.upper()})")
+        print("="*60)
+
+        geo_spending = self._group_spending(level).sort_values('sum', ascending=False)
+
+        print(f"\n🏙️ Top {'Cities' if level == 'City' else level + 's'} by Total Spending:")
+        for i, (member, row) in enumerate(geo_spending.head(8).iterrows(), 1):
+            print(f"{i}. {member}: ₹{row['sum']/1000:.1f}M{self._margin(row['sum_ci']/1000)} "
+                  f"({row['percentage']:.1f}%), Avg: ₹{row['mean']:.1f}K{self._margin(row['mean_ci'])}")
+
+        return geo_spending
+
+    def heavy_hitter_rankings(self, top_k=5):
+        """Streaming top-K categories, cities and category-city pairs with error bounds"""
+        print("\n" + "="*60)
+        print("🔥 HEAVY HITTERS (STREAMING TOP-K)")
+        print("="*60)
+
+        heavy_hitters = load_heavy_hitters(self.detailed_data_path)
+        rankings = {}
+        for grouping in heavy_hitters.groupings:
+            ranking = heavy_hitters.top(grouping, top_k)
+            bounds = heavy_hitters.error_bounds(grouping)
+            rankings[' x '.join(grouping)] = ranking
+
+            print(f"\n🏆 Top {top_k} by {' x '.join(grouping)} "
+                  f"(any key ≤ ₹{bounds['space_saving']/1000:.1f}M over-count):")
+            for _, row in ranking.iterrows():
+                label = ' / '.join(str(row[dim]) for dim in grouping)
+                flag = "" if row['Guaranteed'] else " (rank not guaranteed)"
+                print(f"{row['Rank']}. {label}: ₹{row['Estimate']/1000:.1f}M ±{row['Max_Error']/1000:.1f}M{flag}")
+
+        return rankings
+
+    def confidence_intervals(self, n_resamples=1000, confidence=0.95, n_jobs=None):
+        """Bootstrap confidence intervals for spending shares, CAGR and YoY growth"""
+        print("\n" + "="*60)
+        print("🎲 BOOTSTRAP CONFIDENCE INTERVALS")
         print("="*60)
 
-        # Prepare data for clustering
-        segment_data = self.detailed_df.groupby(['Age_Group', 'Gender', 'Card_Type']).agg({
-            'Spending_Amount_Thousands_INR': ['mean', 'sum', 'count'],
-            'Transaction_Count': 'mean',
-            'Avg_Transaction_Amount_INR': 'mean'
-        }).round(2)
+        options = {
+            'n_resamples': n_resamples,
+            'confidence': confidence,
+            'n_jobs': n_jobs if n_jobs is not None else os.cpu_count()
+        }
+        level = f"{confidence * 100:.0f}% CI"
 
-        # Flatten column names
-        segment_data.columns = ['_'.join(col) for col in segment_data.columns]
-        segment_data = segment_data.reset_index()
+        shares = {}
+        for dimension in ['Category', 'City', 'Age_Group', 'Gender', 'Card_Type']:
+            shares[dimension] = share_intervals(self.detailed_df, dimension, **options)
+            print(f"\n📊 {dimension} Share of Spending ({level}):")
+            for name, row in shares[dimension].iterrows():
+                print(f"{name}: {row['Share']:.1f}% [{row['CI_Lower']:.1f}%, {row['CI_Upper']:.1f}%]")
 
-        # Select features for clustering
-        features = ['Spending_Amount_Thousands_INR_mean', 'Spending_Amount_Thousands_INR_sum', 
-                   'Transaction_Count_mean', 'Avg_Transaction_Amount_INR_mean']
+        cagr = cagr_interval(self.detailed_df, **options)
+        yoy = yoy_interval(self.detailed_df, **options)
 
-        X = segment_data[features].fillna(0)
+        print(f"\n📈 Growth ({level}):")
+        print(f"CAGR {cagr['Start_Year']}-{cagr['End_Year']}: {cagr['CAGR']:.1f}% "
+              f"[{cagr['CI_Lower']:.1f}%, {cagr['CI_Upper']:.1f}%]")
+        print(f"YoY {yoy['Date'].strftime('%B %Y')}: {yoy['YoY_Growth']:.1f}% "
+              f"[{yoy['CI_Lower']:.1f}%, {yoy['CI_Upper']:.1f}%]")
 
-        # Standardize features
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        return {'shares': shares, 'cagr': cagr, 'yoy': yoy}
+
+    def customer_segmentation(self):
+        """Perform customer segmentation using clustering"""
+        print("\n" + "="*60)
+        print("🎯 CUSTOMER SEGMENTATION")
+        print("="*60)
 
-        # Perform K-means clustering
-        kmeans = KMeans(n_clusters=4, random_state=42)
-        segment_data['Cluster'] = kmeans.fit_predict(X_scaled)
+        # K-means over standardized Age_Group x Gender x Card_Type spending features
+        segment_data = segment_customers(self.detailed_df, n_clusters=4)
 
         print("\n🔍 Customer Segments Identified:")
         for cluster in range(4):
@@ -222,76 +437,58 @@ class CreditCardAnalyzer:
             for _, row in top_demo.iterrows():
                 print(f"    • {row['Age_Group']} {row['Gender']} {row['Card_Type']}: ₹{row['Spending_Amount_Thousands_INR_mean']:.1f}K")
 
+        return segment_data
+
     def spending_forecasting(self):
         """Build a simple forecasting model"""
         print("\n" + "="*60)
         print("🔮 SPENDING FORECAST")
         print("="*60)
 
-        # Prepare time series features
-        self.main_df = self.main_df.sort_values('Date')
-        self.main_df['Days_Since_Start'] = (self.main_df['Date'] - self.main_df['Date'].min()).dt.days
-        self.main_df['Month_Sin'] = np.sin(2 * np.pi * self.main_df['Month'] / 12)
-        self.main_df['Month_Cos'] = np.cos(2 * np.pi * self.main_df['Month'] / 12)
-
-        # Features for prediction
-        features = ['Days_Since_Start', 'Month_Sin', 'Month_Cos', 'Active_Cards_Millions', 'Seasonal_Factor']
-        target = 'Total_Spending_Billion_INR'
-
-        # Prepare data
-        X = self.main_df[features].fillna(method='bfill')
-        y = self.main_df[target]
-
-        # Train-test split (use last 12 months as test)
-        split_idx = len(X) - 12
-        X_train, X_test = X[:split_idx], X[split_idx:]
-        y_train, y_test = y[:split_idx], y[split_idx:]
-
-        # Train Random Forest model
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-
-        # Make predictions
-        y_pred = model.predict(X_test)
-
-        # Evaluate model
-        mae = mean_absolute_error(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        r2 = r2_score(y_test, y_pred)
+        # Random Forest on time-based and seasonal features, last 12 months held out
+        forecast = forecast_spending(self.main_df, horizon=6)
 
         print(f"\n📊 Model Performance:")
-        print(f"Mean Absolute Error: ₹{mae:.1f}B")
-        print(f"Root Mean Square Error: ₹{rmse:.1f}B") 
-        print(f"R² Score: {r2:.3f}")
-
-        # Feature importance
-        feature_importance = pd.DataFrame({
-            'feature': features,
-            'importance': model.feature_importances_
-        }).sort_values('importance', ascending=False)
+        print(f"Mean Absolute Error: ₹{forecast['mae']:.1f}B")
+        print(f"Root Mean Square Error: ₹{forecast['rmse']:.1f}B") 
+        print(f"R² Score: {forecast['r2']:.3f}")
 
         print(f"\n🎯 Feature Importance:")
-        for _, row in feature_importance.iterrows():
+        for _, row in forecast['importance'].iterrows():
             print(f"{row['feature']}: {row['importance']:.3f}")
 
-        # Generate future predictions (next 6 months)
         print(f"\n🔮 Next 6 Months Forecast:")
-        last_date = self.main_df['Date'].max()
+        for _, row in forecast['forecast'].iterrows():
+            print(f"{row['Date'].strftime('%B %Y')}: ₹{row['Forecast']:.1f}B")
+
+        return forecast
 
-        for i in range(1, 7):
-            future_date = last_date + pd.DateOffset(months=i)
-            future_features = {
-                'Days_Since_Start': (future_date - self.main_df['Date'].min()).days,
-                'Month_Sin': np.sin(2 * np.pi * future_date.month / 12),
-                'Month_Cos': np.cos(2 * np.pi * future_date.month / 12),
-                'Active_Cards_Millions': self.main_df['Active_Cards_Millions'].iloc[-1] * (1 + 0.01),  # Assume 1% monthly growth
-                'Seasonal_Factor': 1.1 if future_date.month in [10, 11, 12] else 1.0  # Festival season
-            }
+    def top_movers_analysis(self, base=None, current=None, top_n=5):
+        """Find the segments that contributed most to a period-over-period change"""
+        print("\n" + "="*60)
+        print("🔎 TOP MOVERS")
+        print("="*60)
+
+        cube = load_contribution_cube(self.detailed_df, self.detailed_data_path)
+
+        # Default: latest month against the same month a year earlier
+        if current is None:
+            current = cube.periods[-1]
+        if base is None:
+            year_ago = pd.Timestamp(current) - pd.DateOffset(years=1) + pd.offsets.MonthEnd(0)
+            earlier = cube.periods[cube.periods <= year_ago]
+            base = earlier[-1] if len(earlier) else cube.periods[0]
+
+        movers = top_movers(cube, 'Spending_Amount_Thousands_INR', base, current, top_n=top_n)
+        movers['Slice'] = slice_labels(movers, cube.dims)
 
-            future_X = pd.DataFrame([future_features])
-            prediction = model.predict(future_X)[0]
+        for depth, depth_movers in movers.groupby('Depth'):
+            print(f"\n📊 Top {depth}-way Contributors:")
+            for _, row in depth_movers.iterrows():
+                print(f"{row['Slice']} ({row['Level']}): ₹{row['Change']/1000:+.1f}M, "
+                      f"{row['Share_Of_Change']:.1f}% of change")
 
-            print(f"{future_date.strftime('%B %Y')}: ₹{prediction:.1f}B")
+        return movers
 
     def generate_insights(self):
         """Generate key business insights"""
@@ -299,33 +496,13 @@ class CreditCardAnalyzer:
         print("💡 KEY BUSINESS INSIGHTS")
         print("="*60)
 
-        insights = []
-
-        # Growth insights
-        latest_growth = self.main_df['YoY_Growth_Spending'].dropna().iloc[-1]
-        if latest_growth > 20:
-            insights.append("🚀 Experiencing strong double-digit growth in card spending")
-        elif latest_growth > 10:
-            insights.append("📈 Maintaining healthy growth momentum")
-        else:
-            insights.append("📊 Growth is stabilizing")
-
-        # Category insights
-        top_category = self.detailed_df.groupby('Category')['Spending_Amount_Thousands_INR'].sum().idxmax()
-        insights.append(f"🛍️ '{top_category}' dominates spending categories")
-
-        # Demographic insights
-        top_age_group = self.detailed_df.groupby('Age_Group')['Spending_Amount_Thousands_INR'].sum().idxmax()
-        insights.append(f"👥 '{top_age_group}' age group shows highest spending")
-
-        # Geographic insights
-        top_city = self.detailed_df.groupby('City')['Spending_Amount_Thousands_INR'].sum().idxmax()
-        insights.append(f"🏙️ '{top_city}' leads in total card spending")
+        # Evaluate every rule in one batch over the cached rollups
+        cube = load_cube(self.detailed_df, self.detailed_data_path)
+        window_metrics = load_window_metrics(self.detailed_df, self.detailed_data_path)
+        catalog = default_catalog(self.main_df, cube, window_metrics)
+        self.insight_records = evaluate_rules(DEFAULT_RULES, catalog)
 
-        # Seasonal insights
-        peak_month = self.main_df.groupby('Month')['Total_Spending_Billion_INR'].mean().idxmax()
-        peak_month_name = pd.Timestamp(2024, peak_month, 1).strftime('%B')
-        insights.append(f"🗓️ '{peak_month_name}' shows peak seasonal spending")
+        insights = self.insight_records['message'].tolist()
 
         print("\n".join(f"{i+1}. {insight}" for i, insight in enumerate(insights)))
 
@@ -339,11 +516,20 @@ class CreditCardAnalyzer:
         # Run all analyses
         stats = self.statistical_summary()
         trends = self.trend_analysis()
+        seasonality = self.seasonal_decomposition()
+        growth = self.growth_metrics()
         categories = self.category_analysis()
         self.demographic_analysis()
+        cross_tabs = self.cross_tab_analysis()
+        percentiles = self.spending_percentiles()
+        significance = self.significance_analysis()
         self.geographic_analysis()
+        self.geographic_analysis('Region')
+        heavy_hitters = self.heavy_hitter_rankings()
+        intervals = self.confidence_intervals()
         self.customer_segmentation()
         self.spending_forecasting()
+        movers = self.top_movers_analysis()
         insights = self.generate_insights()
 
         print("\n" + "="*80)
@@ -353,8 +539,17 @@ class CreditCardAnalyzer:
         return {
             'stats': stats,
             'trends': trends,
+            'seasonality': seasonality,
+            'growth': growth,
             'categories': categories,
-            'insights': insights
+            'movers': movers,
+            'cross_tabs': cross_tabs,
+            'heavy_hitters': heavy_hitters,
+            'percentiles': percentiles,
+            'significance': significance,
+            'intervals': intervals,
+            'insights': insights,
+            'insight_records': self.insight_records
         }
 
 # Main execution
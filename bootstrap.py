@@ -0,0 +1,145 @@
+"""
+Credit Card Spending Analysis - Bootstrap Confidence Intervals
+==============================================================
+
+Bootstrap confidence intervals for spending shares, CAGR and YoY growth.
+Each chunk of resamples is drawn as a single (resamples x rows) index matrix
+and reduced to per-group sums with one ``np.add.reduceat``, so the work is
+plain array arithmetic. Chunk size is derived from a memory budget, and chunks can
+optionally be spread over a process pool (``n_jobs``).
+
+Cost is linear in resamples x rows: on the 213K-row detailed dataset one core
+takes about 2.5 s per 1,000 resamples per statistic, so 10,000 resamples take
+about 25 s single-core. The ~130 chunks of a 10,000-resample run are
+independent, so wall time divides by the number of worker processes; a
+few-second 10,000-resample interval needs eight or more cores. The analyzer
+defaults to 1,000 resamples.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+MEASURE = 'Spending_Amount_Thousands_INR'
+
+
+def _chunk_sizes(n_resamples, n_rows, max_memory_mb):
+    """Split resamples into chunks whose index matrices fit the memory budget"""
+    # Uniform draws (float32), index matrix (int32) and gathered values (float64)
+    bytes_per_resample = max(n_rows, 1) * (4 + 4 + 8)
+    chunk = max(1, int(max_memory_mb * 1024 * 1024 // bytes_per_resample))
+    sizes = [chunk] * (n_resamples // chunk)
+    if n_resamples % chunk:
+        sizes.append(n_resamples % chunk)
+    return sizes
+
+
+def _resample_chunk(args):
+    """Group sums for one chunk of resamples (module-level so it can run in a worker)"""
+    values, offsets, sizes, n_resamples, seed = args
+    rng = np.random.default_rng(seed)
+    row_offsets = np.repeat(offsets, sizes)
+    row_sizes = np.repeat(sizes, sizes).astype(np.float32)
+
+    # (resamples x rows) index matrix, each row redrawn from within its own group
+    idx = rng.random((n_resamples, len(values)), dtype=np.float32)
+    idx *= row_sizes
+    idx = idx.astype(np.int32)
+    np.minimum(idx, np.repeat(sizes - 1, sizes), out=idx)
+    idx += row_offsets
+    return np.add.reduceat(values[idx], offsets, axis=1)
+
+
+def bootstrap_group_sums(values, group_idx, n_groups, n_resamples=10_000,
+                         seed=42, max_memory_mb=256, n_jobs=1):
+    """(n_resamples x n_groups) bootstrap distribution of per-group sums
+
+    Rows are resampled within their group. The detailed dataset is a complete
+    grid, so group row counts are fixed by design rather than random.
+    """
+    values = np.asarray(values, dtype=float)
+    group_idx = np.asarray(group_idx, dtype=np.int64)
+
+    # Sort rows by group so each group is a contiguous block
+    order = np.argsort(group_idx, kind='stable')
+    values = values[order]
+    sizes = np.bincount(group_idx, minlength=n_groups).astype(np.int32)
+    if (sizes == 0).any():
+        raise ValueError("Every group needs at least one row to bootstrap")
+    offsets = (np.cumsum(sizes) - sizes).astype(np.int32)
+
+    chunk_sizes = _chunk_sizes(n_resamples, len(values), max_memory_mb)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(values, offsets, sizes, size, chunk_seed) for size, chunk_seed in zip(chunk_sizes, seeds)]
+
+    if n_jobs and n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunks = list(executor.map(_resample_chunk, tasks))
+    else:
+        chunks = [_resample_chunk(task) for task in tasks]
+    return np.vstack(chunks)
+
+
+def _interval(distribution, confidence):
+    tail = (1 - confidence) / 2 * 100
+    return np.nanpercentile(distribution, [tail, 100 - tail], axis=0)
+
+
+def share_intervals(df, dimension, measure=MEASURE, confidence=0.95, **kwargs):
+    """Point share and bootstrap interval of each group's share of total spending"""
+    group_idx, labels = pd.factorize(df[dimension], sort=True)
+    values = df[measure].to_numpy(dtype=float)
+
+    point = np.bincount(group_idx, weights=values, minlength=len(labels))
+    point = point / point.sum() * 100
+    sums = bootstrap_group_sums(values, group_idx, len(labels), **kwargs)
+    shares = sums / sums.sum(axis=1, keepdims=True) * 100
+    lower, upper = _interval(shares, confidence)
+
+    return pd.DataFrame({
+        'Share': point, 'CI_Lower': lower, 'CI_Upper': upper
+    }, index=pd.Index(labels, name=dimension)).sort_values('Share', ascending=False)
+
+
+def cagr_interval(df, measure=MEASURE, confidence=0.95, **kwargs):
+    """CAGR between the first and last complete year's totals, resampling rows within each year
+
+    Years with fewer than 12 months of data (e.g. the current year) are left
+    out, since a partial year's total is not comparable with a full one.
+    """
+    months = df['Date'].dt.to_period('M').groupby(df['Year']).nunique()
+    complete = months.index[months == 12]
+    if len(complete) < 2:
+        raise ValueError("CAGR needs at least two complete years of data")
+    df = df[df['Year'].between(complete[0], complete[-1])]
+    year_idx, years = pd.factorize(df['Year'], sort=True)
+    values = df[measure].to_numpy(dtype=float)
+    n_years = years[-1] - years[0]
+
+    def cagr(totals):
+        return ((totals[..., -1] / totals[..., 0]) ** (1 / n_years) - 1) * 100
+
+    point = cagr(np.bincount(year_idx, weights=values, minlength=len(years)))
+    sums = bootstrap_group_sums(values, year_idx, len(years), **kwargs)
+    lower, upper = _interval(cagr(sums), confidence)
+    return {'CAGR': point, 'CI_Lower': lower, 'CI_Upper': upper,
+            'Start_Year': years[0], 'End_Year': years[-1]}
+
+
+def yoy_interval(df, date=None, measure=MEASURE, confidence=0.95, **kwargs):
+    """YoY growth of one month (default: the latest) against the same month a year earlier"""
+    current = pd.Timestamp(date) if date is not None else df['Date'].max()
+    previous = current - pd.DateOffset(years=1) + pd.offsets.MonthEnd(0)
+    subset = df[df['Date'].isin([previous, current])]
+    period_idx = (subset['Date'] == current).to_numpy().astype(np.int64)
+    values = subset[measure].to_numpy(dtype=float)
+
+    def growth(totals):
+        return (totals[..., 1] / totals[..., 0] - 1) * 100
+
+    point = growth(np.bincount(period_idx, weights=values, minlength=2))
+    sums = bootstrap_group_sums(values, period_idx, 2, **kwargs)
+    lower, upper = _interval(growth(sums), confidence)
+    return {'YoY_Growth': point, 'CI_Lower': lower, 'CI_Upper': upper,
+            'Date': current, 'Base_Date': previous}
@@ -0,0 +1,107 @@
+"""
+Credit Card Spending Analysis - Box Plot Summaries
+==================================================
+
+Server-side box plot statistics (quartiles, Tukey whiskers, mean and a capped
+outlier sample) per group. The dashboard renders these with precomputed
+``go.Box`` fences, so the payload sent to the browser stays the same size no
+matter how many rows are summarised.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+
+def _sorted_quantile(values, offsets, sizes, q):
+    """Linear-interpolated quantile of each contiguous sorted group"""
+    position = offsets + q * (sizes - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, offsets + sizes - 1)
+    fraction = position - lower
+    return values[lower] + (values[upper] - values[lower]) * fraction
+
+
+def box_summary(df, group_col, value_col, max_outliers=100, whisker=1.5, seed=0):
+    """Quartiles, whiskers, mean and a capped outlier sample per group
+
+    Returns ``(summary, outliers)``: one row of statistics per group and at
+    most ``max_outliers`` outlying values per group.
+    """
+    group_idx, labels = pd.factorize(df[group_col], sort=True)
+    values = df[value_col].to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    group_idx, values = group_idx[valid], values[valid]
+
+    # Sort by (group, value) so every group is a contiguous, ordered block
+    order = np.lexsort((values, group_idx))
+    group_idx, values = group_idx[order], values[order]
+    sizes = np.bincount(group_idx, minlength=len(labels))
+    present = sizes > 0
+    labels, sizes = np.asarray(labels)[present], sizes[present]
+    offsets = np.cumsum(sizes) - sizes
+    if not len(sizes):
+        columns = [group_col, 'Count', 'Mean', 'Min', 'Q1', 'Median', 'Q3', 'Max',
+                   'Lower_Fence', 'Upper_Fence', 'Outliers']
+        return pd.DataFrame(columns=columns), pd.DataFrame(columns=[group_col, value_col])
+    group_pos = np.repeat(np.arange(len(sizes)), sizes)
+
+    q1 = _sorted_quantile(values, offsets, sizes, 0.25)
+    median = _sorted_quantile(values, offsets, sizes, 0.5)
+    q3 = _sorted_quantile(values, offsets, sizes, 0.75)
+    iqr = q3 - q1
+    low_limit, high_limit = q1 - whisker * iqr, q3 + whisker * iqr
+
+    # Whiskers end at the most extreme values inside the Tukey limits
+    inside = (values >= low_limit[group_pos]) & (values <= high_limit[group_pos])
+    lower_fence = np.fmin.reduceat(np.where(inside, values, np.inf), offsets)
+    upper_fence = np.fmax.reduceat(np.where(inside, values, -np.inf), offsets)
+
+    summary = pd.DataFrame({
+        group_col: labels,
+        'Count': sizes,
+        'Mean': np.add.reduceat(values, offsets) / sizes,
+        'Min': values[offsets],
+        'Q1': q1,
+        'Median': median,
+        'Q3': q3,
+        'Max': values[offsets + sizes - 1],
+        'Lower_Fence': lower_fence,
+        'Upper_Fence': upper_fence,
+        'Outliers': np.bincount(group_pos[~inside], minlength=len(sizes)),
+    })
+
+    outlier_rows = np.flatnonzero(~inside)
+    rng = np.random.default_rng(seed)
+    outlier_rows = outlier_rows[rng.permutation(len(outlier_rows))]
+    outliers = pd.DataFrame({group_col: labels[group_pos[outlier_rows]], value_col: values[outlier_rows]})
+    outliers = outliers.groupby(group_col, sort=False).head(max_outliers).reset_index(drop=True)
+    return summary, outliers
+
+
+def box_figure(summary, outliers, group_col, value_col, title=None):
+    """Box plot drawn from precomputed statistics plus the outlier sample"""
+    fig = go.Figure()
+    fig.add_trace(go.Box(
+        x=summary[group_col],
+        q1=summary['Q1'],
+        median=summary['Median'],
+        q3=summary['Q3'],
+        lowerfence=summary['Lower_Fence'],
+        upperfence=summary['Upper_Fence'],
+        mean=summary['Mean'],
+        name=value_col,
+        boxpoints=False,
+        showlegend=False
+    ))
+    if len(outliers):
+        fig.add_trace(go.Scatter(
+            x=outliers[group_col],
+            y=outliers[value_col],
+            mode='markers',
+            marker=dict(size=4, opacity=0.5),
+            name='Outliers (sample)',
+            showlegend=False
+        ))
+    fig.update_layout(title=title, xaxis_title=group_col, yaxis_title=value_col)
+    return fig
@@ -0,0 +1,64 @@
+"""
+Credit Card Spending Analysis - Contribution Analysis
+=====================================================
+
+Finds the Category/City/Age_Group/Gender/Card_Type combinations that drove a
+period-over-period change. Every slice of the precomputed rollup cube (down to
+3-way interactions) is differenced and ranked in one array operation, giving
+each slice's absolute change and its share of the total change.
+"""
+
+import numpy as np
+
+from cube import load_cube
+
+
+def _as_range(period):
+    """Accept a single date or a (start, end) pair"""
+    if isinstance(period, (tuple, list)):
+        return period[0], period[1]
+    return period, period
+
+
+def contribution_table(cube, measure, base, current):
+    """Base, current, change and share of change for every slice of ``cube``"""
+    base_totals = cube.period_totals(measure, *_as_range(base))
+    current_totals = cube.period_totals(measure, *_as_range(current))
+    change = current_totals - base_totals
+
+    # Any complete grouping set sums to the overall change; prefer the Total row
+    reference = cube.level('Total') if cube.level('Total').any() else cube.level(cube.keys['Level'].iloc[0])
+    total_change = change[reference].sum()
+
+    table = cube.keys.copy()
+    table['Depth'] = np.where(table['Level'] == 'Total', 0, table['Level'].str.count(' x ') + 1)
+    table['Base'] = base_totals
+    table['Current'] = current_totals
+    table['Change'] = change
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['Pct_Change'] = np.where(base_totals != 0, change / base_totals * 100, np.nan)
+        table['Share_Of_Change'] = change / total_change * 100 if total_change != 0 else np.nan
+
+    # Rank within each grouping set by the size of the move
+    table['Abs_Change'] = np.abs(change)
+    table['Rank'] = table.groupby('Level')['Abs_Change'].rank(ascending=False, method='first').astype(int)
+    return table.drop(columns='Abs_Change')
+
+
+def top_movers(cube, measure, base, current, top_n=10, max_depth=3, direction='both'):
+    """Top contributing slices per depth (1-way, 2-way, 3-way)"""
+    table = contribution_table(cube, measure, base, current)
+    table = table[(table['Depth'] >= 1) & (table['Depth'] <= max_depth)]
+    if direction == 'up':
+        table = table[table['Change'] > 0]
+    elif direction == 'down':
+        table = table[table['Change'] < 0]
+
+    order = np.lexsort((-np.abs(table['Change'].to_numpy()), table['Depth'].to_numpy()))
+    ranked = table.iloc[order]
+    return ranked.groupby('Depth', sort=True).head(top_n).reset_index(drop=True)
+
+
+def load_contribution_cube(detailed_df, source_path, max_depth=3):
+    """Rollup cube down to ``max_depth``-way interactions used for contribution analysis"""
+    return load_cube(detailed_df, source_path, max_depth=max_depth)
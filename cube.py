@@ -0,0 +1,146 @@
+"""
+Credit Card Spending Analysis - Series Cube
+===========================================
+
+Turns the detailed dataset into dense (series x period) arrays, one row per
+slice of every requested grouping set (e.g. each Category, each City, each
+Category x City pair). Analytics built on top of the cube run as array
+operations over the time axis instead of per-group pandas ``apply`` calls.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from store import cached_result, result_key
+
+# Dimensions and additive measures of the detailed dataset
+DIMENSIONS = ['Category', 'City', 'Age_Group', 'Gender', 'Card_Type']
+MEASURES = ['Spending_Amount_Thousands_INR', 'Transaction_Count']
+
+# Label used in key columns for dimensions that are rolled up
+ALL = 'All'
+
+
+def grouping_sets(dims=DIMENSIONS, max_depth=1, include_total=True):
+    """List the dimension combinations to roll up, coarsest first"""
+    sets = [()] if include_total else []
+    for depth in range(1, max_depth + 1):
+        sets.extend(itertools.combinations(dims, depth))
+    return sets
+
+
+def level_name(group_dims):
+    """Human readable name of a grouping set"""
+    return ' x '.join(group_dims) if group_dims else 'Total'
+
+
+def slice_labels(keys, dims):
+    """Readable label per key row, e.g. 'Travel / Mumbai' or 'All'"""
+    parts = keys[dims].astype(str).where(keys[dims] != ALL, '')
+    labels = parts.apply(lambda row: ' / '.join(v for v in row if v), axis=1)
+    return labels.replace('', ALL)
+
+
+def encode_columns(df, dims):
+    """Integer-code each dimension column, returning (codes, labels) dicts"""
+    codes, labels = {}, {}
+    for dim in dims:
+        codes[dim], labels[dim] = pd.factorize(df[dim], sort=True)
+    return codes, labels
+
+
+class SeriesCube:
+    """Dense (series x period) matrices for every slice of several grouping sets"""
+
+    def __init__(self, keys, periods, values, counts):
+        self.keys = keys.reset_index(drop=True)
+        self.periods = pd.DatetimeIndex(periods)
+        self.values = values
+        self.counts = counts
+        self.dims = [col for col in keys.columns if col != 'Level']
+        self._positions = {
+            tuple(row): i for i, row in enumerate(self.keys[self.dims].itertuples(index=False))
+        }
+
+    @classmethod
+    def from_frame(cls, df, sets=None, measures=MEASURES, date_col='Date'):
+        """Build the cube from a detailed-level DataFrame in one pass per grouping set"""
+        if sets is None:
+            sets = grouping_sets()
+        dims = [dim for dim in DIMENSIONS if any(dim in s for s in sets)]
+        period_codes, periods = pd.factorize(df[date_col], sort=True)
+        n_periods = len(periods)
+        dim_codes, dim_labels = encode_columns(df, dims)
+        measure_arrays = {m: df[m].to_numpy(dtype=float) for m in measures}
+
+        key_frames = []
+        value_blocks = {m: [] for m in measures}
+        count_blocks = []
+
+        for group_dims in sets:
+            # Mixed-radix code of the slice, compacted to observed combinations
+            slice_code = np.zeros(len(df), dtype=np.int64)
+            for dim in group_dims:
+                slice_code = slice_code * len(dim_labels[dim]) + dim_codes[dim]
+            observed, slice_idx = np.unique(slice_code, return_inverse=True)
+            n_series = len(observed)
+            flat = slice_idx * n_periods + period_codes
+            size = n_series * n_periods
+
+            for m in measures:
+                block = np.bincount(flat, weights=measure_arrays[m], minlength=size)
+                value_blocks[m].append(block.reshape(n_series, n_periods))
+            count_blocks.append(np.bincount(flat, minlength=size).reshape(n_series, n_periods))
+
+            keys = pd.DataFrame({'Level': level_name(group_dims)}, index=range(n_series))
+            remainder = observed.copy()
+            for dim in reversed(group_dims):
+                radix = len(dim_labels[dim])
+                keys[dim] = np.asarray(dim_labels[dim])[remainder % radix]
+                remainder //= radix
+            for dim in dims:
+                if dim not in group_dims:
+                    keys[dim] = ALL
+            key_frames.append(keys[['Level'] + dims])
+
+        keys = pd.concat(key_frames, ignore_index=True)
+        values = {m: np.vstack(value_blocks[m]) for m in measures}
+        counts = np.vstack(count_blocks)
+        return cls(keys, periods, values, counts)
+
+    def position(self, **slice_filter):
+        """Row index of a slice, e.g. ``position(Category='Travel')``"""
+        key = tuple(slice_filter.get(dim, ALL) for dim in self.dims)
+        if key not in self._positions:
+            raise KeyError(f"Slice not in cube: {slice_filter}")
+        return self._positions[key]
+
+    def series(self, measure, **slice_filter):
+        """Time series of one measure for one slice"""
+        row = self.values[measure][self.position(**slice_filter)]
+        return pd.Series(row, index=self.periods, name=measure)
+
+    def period_totals(self, measure, start=None, end=None):
+        """Total of a measure per slice over periods in [start, end]"""
+        mask = np.ones(len(self.periods), dtype=bool)
+        if start is not None:
+            mask &= self.periods >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.periods <= pd.Timestamp(end)
+        return self.values[measure][:, mask].sum(axis=1)
+
+    def level(self, name):
+        """Boolean row mask of all slices in a grouping set"""
+        return (self.keys['Level'] == name).to_numpy()
+
+
+def load_cube(detailed_df, source_path, max_depth=1, measures=MEASURES):
+    """Persisted rollup cube of every slice up to ``max_depth`` dimensions"""
+    sets = grouping_sets(max_depth=max_depth)
+
+    def compute():
+        return SeriesCube.from_frame(detailed_df, sets=sets, measures=measures)
+
+    return cached_result(result_key('cube', tuple(measures), sets), [source_path], compute)
@@ -0,0 +1,107 @@
+"""
+Credit Card Spending Analysis - Dashboard Cache
+===============================================
+
+Process-wide, memory-bounded LRU cache for the dashboard's derived
+aggregates. Keys capture everything an aggregate depends on (tab, date range,
+filter state, dataset version), so switching tabs or returning to an earlier
+filter state is a lookup instead of a recomputation. An optional disk tier
+(see ``store``) keeps computed aggregates across server restarts; it is
+bounded too, evicting the least recently used files.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from store import CACHE_DIR, cached_result, prune_results, result_key, touch_result
+
+
+def estimate_size(value):
+    """Approximate in-memory size of a cached value in bytes"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+def filter_state_key(filters):
+    """Hashable, order-independent representation of ``{dim: [values]}`` filters"""
+    return tuple(sorted((dim, tuple(sorted(values))) for dim, values in filters.items()))
+
+
+class AggregateCache:
+    """Thread-safe LRU cache bounded by the total estimated size of its entries
+
+    With ``sources`` set, memory misses fall through to a persistent tier that
+    is invalidated when any source file changes and holds at most
+    ``max_disk_bytes`` of aggregates.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, sources=None, cache_dir=CACHE_DIR,
+                 max_disk_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.sources = sources
+        self.cache_dir = cache_dir
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Cached value for ``key``, computing and storing it on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        if self.sources is not None:
+            name = result_key('aggregate', key)
+            value = cached_result(name, self.sources, compute, self.cache_dir)
+            # Every filter state gets its own file; keep the most recently used ones within budget
+            touch_result(name, self.cache_dir)
+            prune_results('aggregate', self.max_disk_bytes, self.cache_dir)
+        else:
+            value = compute()
+        return self.put(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
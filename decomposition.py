@@ -0,0 +1,122 @@
+"""
+Credit Card Spending Analysis - Seasonal Decomposition
+======================================================
+
+Classical decomposition (trend, seasonal index, residual) of every series in a
+SeriesCube at once. The trend is a centred 2x12 moving average computed as a
+convolution over the time axis of the whole (series x period) matrix, and the
+seasonal index is the per-calendar-month mean of the detrended values.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from cube import SeriesCube, grouping_sets
+from store import cached_result, result_key
+
+
+def centred_moving_average(values, period=12):
+    """Centred moving average along the last axis, NaN-padded at both ends"""
+    if period % 2 == 0:
+        kernel = np.r_[0.5, np.ones(period - 1), 0.5] / period
+    else:
+        kernel = np.ones(period) / period
+    half = len(kernel) // 2
+    trend = np.full(values.shape, np.nan)
+    if values.shape[-1] >= len(kernel):
+        windows = sliding_window_view(values, len(kernel), axis=-1)
+        trend[..., half:values.shape[-1] - half] = windows @ kernel
+    return trend
+
+
+class Decomposition:
+    """Trend, seasonal and residual components for every series of a cube"""
+
+    def __init__(self, keys, periods, observed, trend, seasonal_index, model):
+        self.keys = keys
+        self.periods = pd.DatetimeIndex(periods)
+        self.observed = observed
+        self.trend = trend
+        self.seasonal_index = seasonal_index
+        self.model = model
+        self.dims = [col for col in keys.columns if col != 'Level']
+        self._positions = {
+            tuple(row): i for i, row in enumerate(keys[self.dims].itertuples(index=False))
+        }
+
+    @property
+    def seasonal(self):
+        """Seasonal component expanded over the time axis"""
+        return self.seasonal_index[:, self.periods.month - 1]
+
+    @property
+    def residual(self):
+        if self.model == 'multiplicative':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return self.observed / (self.trend * self.seasonal)
+        return self.observed - self.trend - self.seasonal
+
+    def position(self, **slice_filter):
+        key = tuple(slice_filter.get(dim, 'All') for dim in self.dims)
+        if key not in self._positions:
+            raise KeyError(f"Slice not decomposed: {slice_filter}")
+        return self._positions[key]
+
+    def series(self, **slice_filter):
+        """Observed, trend, seasonal and residual for one slice"""
+        i = self.position(**slice_filter)
+        return pd.DataFrame({
+            'Observed': self.observed[i],
+            'Trend': self.trend[i],
+            'Seasonal': self.seasonal[i],
+            'Residual': self.residual[i],
+        }, index=self.periods)
+
+    def monthly_index(self, **slice_filter):
+        """Seasonal index by calendar month (1-12) for one slice"""
+        i = self.position(**slice_filter)
+        return pd.Series(self.seasonal_index[i], index=range(1, 13), name='Seasonal_Index')
+
+    def seasonal_table(self):
+        """Seasonal index of every slice as a (slice x month) DataFrame"""
+        table = pd.DataFrame(self.seasonal_index, columns=range(1, 13))
+        return pd.concat([self.keys, table], axis=1)
+
+
+def decompose(cube, measure='Spending_Amount_Thousands_INR', period=12, model='multiplicative'):
+    """Decompose every series of ``cube`` in a single vectorized pass"""
+    observed = cube.values[measure]
+    trend = centred_moving_average(observed, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        detrended = observed / trend if model == 'multiplicative' else observed - trend
+
+    # Per-month means via a (period x month) one-hot matrix product
+    month_onehot = np.eye(12)[cube.periods.month - 1]
+    valid = ~np.isnan(detrended)
+    month_sums = np.where(valid, detrended, 0.0) @ month_onehot
+    month_counts = valid.astype(float) @ month_onehot
+    with np.errstate(divide='ignore', invalid='ignore'):
+        seasonal_index = month_sums / month_counts
+
+    # Normalise so the index averages to 1 (multiplicative) or 0 (additive)
+    if model == 'multiplicative':
+        seasonal_index = seasonal_index / np.nanmean(seasonal_index, axis=1, keepdims=True)
+    else:
+        seasonal_index = seasonal_index - np.nanmean(seasonal_index, axis=1, keepdims=True)
+
+    return Decomposition(cube.keys, cube.periods, observed, trend, seasonal_index, model)
+
+
+def load_decomposition(detailed_df, source_path, measure='Spending_Amount_Thousands_INR',
+                       sets=None):
+    """Persisted decomposition of every Category/City/demographic series"""
+    if sets is None:
+        sets = grouping_sets()
+
+    def compute():
+        cube = SeriesCube.from_frame(detailed_df, sets=sets, measures=[measure])
+        return decompose(cube, measure)
+
+    return cached_result(result_key('decomposition', measure, sets), [source_path], compute)
@@ -0,0 +1,93 @@
+"""
+Credit Card Spending Analysis - Chart Downsampling
+==================================================
+
+Server-side reduction of long time series before they are sent to the
+browser. A series is cut down to about one point per horizontal pixel, either
+with Largest-Triangle-Three-Buckets (keeps the visual shape of the line) or
+with min/max bucketing (keeps every local extreme). Grouped series share one
+set of x values, picked from their total, so stacked areas stay aligned.
+
+Charts with more points than ``WEBGL_THRESHOLD`` should be drawn with WebGL
+traces (``Scattergl`` / ``render_mode='webgl'``) and without markers.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Plotly Express switches to WebGL at the same size in its 'auto' render mode
+WEBGL_THRESHOLD = 1000
+DEFAULT_MAX_POINTS = 1200
+METHODS = ('lttb', 'minmax')
+
+
+def use_webgl(n_points, threshold=WEBGL_THRESHOLD):
+    """True when a chart has too many points for SVG rendering"""
+    return n_points > threshold
+
+
+def _numeric(values):
+    """Float positions for numeric or datetime x values"""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=float)
+    return values.to_numpy(dtype=float)
+
+
+def lttb_indices(x, y, n_out):
+    """Positions of the ``n_out`` points Largest-Triangle-Three-Buckets keeps"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    # First and last points are always kept; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[anchor] - next_x) * (y[start:end] - y[anchor])
+                      - (x[anchor] - x[start:end]) * (next_y - y[anchor]))
+        anchor = start + int(np.argmax(area))
+        selected[i + 1] = anchor
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """Positions of each bucket's minimum and maximum (plus the end points), at most ``n_out``"""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    edges = np.linspace(0, n, (n_out - 2) // 2 + 1).astype(int)
+    picks = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        picks.append(start + int(np.argmin(y[start:end])))
+        picks.append(start + int(np.argmax(y[start:end])))
+    return np.unique(picks)
+
+
+def downsample(frame, x, y, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """Rows of ``frame`` restricted to at most ``max_points`` x values that preserve the shape of ``y``
+
+    For long-format frames (one row per group and x value), the x values are
+    chosen from the total of ``y`` over all groups and kept for every group.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    totals = frame.groupby(x, sort=True)[y].sum()
+    if max_points is None or len(totals) <= max_points:
+        return frame
+    if method == 'lttb':
+        picks = lttb_indices(_numeric(totals.index), totals.to_numpy(), max_points)
+    else:
+        picks = minmax_indices(totals.to_numpy(), max_points)
+    return frame[frame[x].isin(totals.index[picks])]
@@ -0,0 +1,83 @@
+"""
+Credit Card Spending Analysis - Data Export
+===========================================
+
+Writes a DataFrame to a temporary file in fixed-size row chunks, as plain,
+gzip- or zstd-compressed CSV or as Parquet, so encoding never holds more than
+one chunk of encoded text in memory. A dashboard download still holds the
+whole encoded file once: Streamlit serves ``download_button`` payloads from
+its in-memory media store. zstd needs ``zstandard`` and Parquet needs
+``pyarrow``; formats whose library is missing are not offered.
+"""
+
+import gzip
+import importlib.util
+import io
+import os
+import tempfile
+
+EXPORT_FORMATS = {
+    'CSV': {'extension': '.csv', 'mime': 'text/csv', 'requires': None},
+    'CSV (gzip)': {'extension': '.csv.gz', 'mime': 'application/gzip', 'requires': None},
+    'CSV (zstd)': {'extension': '.csv.zst', 'mime': 'application/zstd', 'requires': 'zstandard'},
+    'Parquet': {'extension': '.parquet', 'mime': 'application/vnd.apache.parquet', 'requires': 'pyarrow'},
+}
+
+
+def available_formats():
+    """Export formats whose optional dependency is installed"""
+    return [
+        name for name, spec in EXPORT_FORMATS.items()
+        if spec['requires'] is None or importlib.util.find_spec(spec['requires']) is not None
+    ]
+
+
+def _text_sink(path, fmt):
+    """Text stream writing (and compressing) into ``path``"""
+    if fmt == 'CSV (gzip)':
+        return gzip.open(path, 'wt', newline='', encoding='utf-8', compresslevel=6)
+    if fmt == 'CSV (zstd)':
+        import zstandard
+        raw = open(path, 'wb')
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=3).stream_writer(raw), encoding='utf-8', newline='')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def write_export(df, path, fmt='CSV', columns=None, chunksize=50_000):
+    """Write ``df`` (optionally a subset of its columns) to ``path`` one chunk of rows at a time"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    columns = list(columns) if columns else list(df.columns)
+    starts = range(0, len(df), chunksize) if len(df) else [0]
+
+    if fmt == 'Parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for start in starts:
+            table = pa.Table.from_pandas(df.iloc[start:start + chunksize][columns], preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        writer.close()
+    else:
+        with _text_sink(path, fmt) as sink:
+            for start in starts:
+                df.iloc[start:start + chunksize][columns].to_csv(sink, header=start == 0, index=False)
+    return path
+
+
+def export_bytes(df, fmt='CSV', columns=None, chunksize=50_000):
+    """Encoded export of ``df`` as bytes, written chunk by chunk through a temporary file
+
+    Peak memory is the whole encoded payload plus one chunk of rows; the
+    temporary file is closed and removed before returning.
+    """
+    fd, path = tempfile.mkstemp(prefix='card_spending_', suffix=EXPORT_FORMATS[fmt]['extension'])
+    os.close(fd)
+    try:
+        write_export(df, path, fmt, columns, chunksize)
+        with open(path, 'rb') as handle:
+            return handle.read()
+    finally:
+        os.remove(path)
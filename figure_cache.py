@@ -0,0 +1,69 @@
+"""
+Credit Card Spending Analysis - Figure Cache
+============================================
+
+Serialized Plotly figures keyed by (chart id, hash of the input aggregate,
+layout parameters). A rerun whose chart inputs did not change reuses the
+stored figure JSON instead of rebuilding the figure with Plotly Express, in
+this session and in every other session of the server process. Entries are
+evicted least-recently-used once the cache exceeds its byte budget.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from dashboard_cache import AggregateCache
+
+
+def data_hash(value):
+    """Content hash of a chart's input data (frames, series, arrays, or containers of them)"""
+    md5 = hashlib.md5()
+
+    def update(item):
+        if isinstance(item, (pd.DataFrame, pd.Series)):
+            frame = item.to_frame() if isinstance(item, pd.Series) else item
+            md5.update(repr((type(item).__name__, list(frame.columns), [str(d) for d in frame.dtypes])).encode())
+            md5.update(pd.util.hash_pandas_object(item, index=True).to_numpy().tobytes())
+        elif isinstance(item, np.ndarray):
+            md5.update(repr((item.dtype.str, item.shape)).encode())
+            md5.update(np.ascontiguousarray(item).tobytes())
+        elif isinstance(item, (tuple, list)):
+            md5.update(f"{type(item).__name__}{len(item)}".encode())
+            for element in item:
+                update(element)
+        elif isinstance(item, dict):
+            for key in sorted(item, key=repr):
+                md5.update(repr(key).encode())
+                update(item[key])
+        else:
+            md5.update(repr(item).encode())
+
+    update(value)
+    return md5.hexdigest()
+
+
+class FigureCache:
+    """LRU cache of Plotly figure JSON, bounded by the total size of the stored strings"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self._specs = AggregateCache(max_bytes=max_bytes)
+
+    @property
+    def hits(self):
+        return self._specs.hits
+
+    @property
+    def misses(self):
+        return self._specs.misses
+
+    def figure(self, chart_id, data, build, **params):
+        """Figure dict for ``chart_id``; ``build()`` only runs when data or params are new"""
+        key = (chart_id, data_hash(data), tuple(sorted((name, repr(value)) for name, value in params.items())))
+        spec = self._specs.get_or_compute(key, lambda: build().to_json())
+        return json.loads(spec)
+
+    def clear(self):
+        self._specs.clear()
@@ -0,0 +1,83 @@
+"""
+Credit Card Spending Analysis - Geography Dimension
+===================================================
+
+Dimension table mapping each city to coarser geographic levels (state,
+region, tier), read from ``city_dimension.csv``. Every level is integer-coded
+once per city, so a rollup aggregates at city level and then bincounts the
+per-city rows through the city -> level code table; the detailed rows are
+never joined against the dimension strings. Cities missing from the table
+roll up into an 'Unmapped' member at every level.
+"""
+
+import numpy as np
+import pandas as pd
+
+from sampling import exact_table
+
+GEO_LEVELS = ['City', 'State', 'Region', 'Tier']
+DIMENSION_TABLE = 'city_dimension.csv'
+UNMAPPED = 'Unmapped'
+
+
+class GeoDimension:
+    """City -> State / Region / Tier mapping with integer codes per level"""
+
+    def __init__(self, table):
+        if table['City'].duplicated().any():
+            duplicates = sorted(table.loc[table['City'].duplicated(), 'City'])
+            raise ValueError(f"Cities listed more than once in the dimension table: {duplicates}")
+        self.table = table.reset_index(drop=True)
+        self.levels = [level for level in GEO_LEVELS if level in table.columns]
+        self.cities = pd.Index(self.table['City'])
+        self._codes = {}
+        self._labels = {}
+        for level in self.levels[1:]:
+            codes, labels = pd.factorize(self.table[level], sort=True)
+            # One extra trailing code for cities the table does not list
+            self._codes[level] = np.append(codes, len(labels))
+            self._labels[level] = pd.Index(list(labels) + [UNMAPPED], name=level)
+
+    @classmethod
+    def from_csv(cls, path=DIMENSION_TABLE):
+        return cls(pd.read_csv(path))
+
+    def _city_positions(self, cities):
+        """Row of each city in the table, or the trailing 'Unmapped' slot"""
+        positions = self.cities.get_indexer(pd.Index(cities))
+        positions[positions < 0] = len(self.cities)
+        return positions
+
+    def level_codes(self, cities, level):
+        """Code of ``level`` for each of ``cities`` (a short list of distinct cities)"""
+        return self._codes[level][self._city_positions(cities)]
+
+    def codes(self, city_values, level):
+        """Integer group code per row of ``city_values`` at ``level``, and the code labels"""
+        city_codes, city_labels = pd.factorize(np.asarray(city_values), sort=True)
+        if level == 'City':
+            return city_codes, pd.Index(city_labels, name='City')
+        return self.level_codes(city_labels, level)[city_codes], self._labels[level]
+
+    def members(self, level, value, cities=None):
+        """Cities of one member of ``level``, e.g. ``members('Region', 'West')``
+
+        ``cities`` restricts the answer to a given set (e.g. the cities in the
+        data), which is also how 'Unmapped' members are resolved.
+        """
+        cities = self.cities if cities is None else pd.Index(cities)
+        if level == 'City':
+            return [value] if value in cities else []
+        codes = self.level_codes(cities, level)
+        return cities[codes == self._labels[level].get_loc(value)].tolist()
+
+    def rollup(self, city_groups, level):
+        """Roll an exact per-City table (``exact_groups`` layout) up to ``level``"""
+        if level == 'City':
+            return city_groups
+        labels = self._labels[level]
+        codes = self.level_codes(city_groups.index, level)
+        sums = np.bincount(codes, weights=city_groups['sum'].to_numpy(), minlength=len(labels))
+        counts = np.bincount(codes, weights=city_groups['count'].to_numpy(), minlength=len(labels))
+        present = counts > 0
+        return exact_table(sums[present], counts[present], labels[present])
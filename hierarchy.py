@@ -0,0 +1,106 @@
+"""
+Credit Card Spending Analysis - Drill-down Hierarchy
+====================================================
+
+Precomputed aggregates for every node of the City -> Category -> Age_Group ->
+Card_Type hierarchy. Each level is one grouping set of a SeriesCube; a node's
+children are located through a path lookup and their date-range totals are
+prefix-sum differences, so drilling down or back up never groups the detailed
+rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cube import MEASURES, SeriesCube, level_name
+from indexes import cumulative_columns, date_bounds
+from store import cached_result, result_key
+
+HIERARCHY = ('City', 'Category', 'Age_Group', 'Card_Type')
+SPENDING = 'Spending_Amount_Thousands_INR'
+TRANSACTIONS = 'Transaction_Count'
+
+
+class DrillDownHierarchy:
+    """Node and child aggregates for every path of a dimension hierarchy"""
+
+    def __init__(self, cube, hierarchy=HIERARCHY):
+        self.hierarchy = tuple(hierarchy)
+        self.periods = cube.periods
+        self.dates = self.periods.to_numpy(dtype='datetime64[ns]')
+        self.values = cube.values
+        self.prefix = {measure: cumulative_columns(block) for measure, block in cube.values.items()}
+        self.count_prefix = cumulative_columns(cube.counts)
+
+        # Cube row of every path, and the (label-sorted) rows of every node's children
+        self._nodes = {}
+        children = {}
+        for depth in range(len(self.hierarchy) + 1):
+            dims = list(self.hierarchy[:depth])
+            rows = np.flatnonzero(cube.level(level_name(tuple(dims))))
+            for row, path in zip(rows, cube.keys.loc[rows, dims].to_numpy().tolist()):
+                path = tuple(path)
+                self._nodes[path] = row
+                if depth:
+                    children.setdefault(path[:-1], []).append(row)
+        self._children = {path: np.asarray(rows) for path, rows in children.items()}
+        self._labels = {
+            path: cube.keys.loc[rows, self.hierarchy[len(path)]].to_numpy() for path, rows in self._children.items()
+        }
+
+    @classmethod
+    def from_frame(cls, df, hierarchy=HIERARCHY, measures=MEASURES):
+        """Build every level of the hierarchy in one cube pass per level"""
+        sets = [tuple(hierarchy[:depth]) for depth in range(len(hierarchy) + 1)]
+        return cls(SeriesCube.from_frame(df, sets=sets, measures=measures), hierarchy)
+
+    def next_dim(self, path):
+        """Dimension of the children of ``path``, or None at a leaf"""
+        return self.hierarchy[len(path)] if len(path) < len(self.hierarchy) else None
+
+    def _totals(self, rows, start, end):
+        lo, hi = date_bounds(self.dates, start, end)
+        totals = {measure: prefix[rows, hi] - prefix[rows, lo] for measure, prefix in self.prefix.items()}
+        totals['Rows'] = self.count_prefix[rows, hi] - self.count_prefix[rows, lo]
+        return totals
+
+    def node(self, path, start=None, end=None):
+        """Totals of one node within [start, end]"""
+        path = tuple(path)
+        if path not in self._nodes:
+            raise KeyError(f"Path not in hierarchy: {path}")
+        totals = self._totals(np.array([self._nodes[path]]), start, end)
+        return {name: float(values[0]) for name, values in totals.items()}
+
+    def children(self, path, start=None, end=None):
+        """Totals, share of the parent and average transaction of each child of ``path``"""
+        path = tuple(path)
+        dim = self.next_dim(path)
+        if dim is None or path not in self._children:
+            return pd.DataFrame(columns=[SPENDING, TRANSACTIONS, 'Rows', 'Share', 'Avg_Transaction_INR'])
+        totals = self._totals(self._children[path], start, end)
+        frame = pd.DataFrame(totals, index=pd.Index(self._labels[path], name=dim))
+        frame['Rows'] = frame['Rows'].astype(np.int64)
+        parent_total = frame[SPENDING].sum()
+        frame['Share'] = frame[SPENDING] / parent_total * 100 if parent_total else 0.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frame['Avg_Transaction_INR'] = frame[SPENDING] * 1000 / frame[TRANSACTIONS]
+        return frame[frame['Rows'] > 0]
+
+    def trend(self, path, start=None, end=None):
+        """Monthly totals of one node within [start, end]"""
+        lo, hi = date_bounds(self.dates, start, end)
+        row = self._nodes[tuple(path)]
+        trend = pd.DataFrame({'Date': self.periods[lo:hi]})
+        for measure, block in self.values.items():
+            trend[measure] = block[row, lo:hi]
+        return trend
+
+
+def load_hierarchy(detailed_df, source_path, hierarchy=HIERARCHY, measures=MEASURES):
+    """Persisted drill-down aggregates of ``hierarchy``"""
+
+    def compute():
+        return DrillDownHierarchy.from_frame(detailed_df, hierarchy, measures)
+
+    return cached_result(result_key('hierarchy', tuple(hierarchy), tuple(measures)), [source_path], compute)
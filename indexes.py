@@ -0,0 +1,215 @@
+"""
+Credit Card Spending Analysis - Dashboard Indexes
+=================================================
+
+In-memory indexes that let the Streamlit dashboard answer filter changes
+without rescanning the data on every rerun.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cube import DIMENSIONS, MEASURES, SeriesCube
+from sampling import exact_table
+from store import cached_result, result_key
+
+
+def date_bounds(dates, start=None, end=None):
+    """Positions [lo, hi) of sorted ``dates`` within [start, end]; ``end`` includes the whole day"""
+    lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left')
+    if end is None:
+        hi = len(dates)
+    else:
+        end_exclusive = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+        hi = np.searchsorted(dates, np.datetime64(end_exclusive), side='left')
+    return int(lo), int(max(hi, lo))
+
+
+def cumulative_columns(block):
+    """Cumulative sums along the time axis with a leading zero column, so the total over
+    periods [lo, hi) of each row is ``prefix[:, hi] - prefix[:, lo]``"""
+    return np.concatenate([np.zeros((len(block), 1)), np.cumsum(block, axis=1)], axis=1)
+
+
+class DateRangeIndex:
+    """Date-sorted frame whose date-range filters are binary searches plus a slice"""
+
+    def __init__(self, df, date_col='Date'):
+        if not df[date_col].is_monotonic_increasing:
+            df = df.sort_values(date_col, kind='stable', ignore_index=True)
+        self.df = df
+        self.dates = df[date_col].to_numpy(dtype='datetime64[ns]')
+
+    def bounds(self, start=None, end=None):
+        """Row bounds [lo, hi) of dates within [start, end]; ``end`` includes the whole day"""
+        return date_bounds(self.dates, start, end)
+
+    def slice(self, start=None, end=None):
+        """Rows within [start, end] as a positional slice of the sorted frame"""
+        lo, hi = self.bounds(start, end)
+        return self.df.iloc[lo:hi]
+
+
+class BitmapIndex:
+    """Packed per-value bitmaps for dimension filters, with memoized combined masks
+
+    Values selected within one dimension are OR-ed together and dimensions are
+    AND-ed. Row positions refer to the frame the index was built on, so build it
+    on the same date-sorted frame as the DateRangeIndex to combine the two.
+    """
+
+    def __init__(self, df, dims, cache_size=16):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        self._values = {}
+        for dim in dims:
+            codes, labels = pd.factorize(df[dim])
+            self._values[dim] = list(labels)
+            self.bitmaps[dim] = {
+                label: np.packbits(codes == code) for code, label in enumerate(labels)
+            }
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def values(self, dim):
+        """Distinct values of a dimension in order of first appearance"""
+        return list(self._values[dim])
+
+    @staticmethod
+    def _state_key(filters):
+        return tuple(sorted((dim, tuple(sorted(values))) for dim, values in filters.items()))
+
+    def _active(self, filters):
+        """Drop dimensions whose selection covers every value (no restriction)"""
+        return {
+            dim: values for dim, values in filters.items()
+            if values is not None and set(values) != set(self._values[dim])
+        }
+
+    def mask(self, filters):
+        """Packed bitmap of rows matching ``{dim: [values]}``, or None for no restriction"""
+        filters = self._active(filters)
+        if not filters:
+            return None
+        key = self._state_key(filters)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        combined = None
+        for dim, values in filters.items():
+            dim_mask = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+            for value in values:
+                if value in self.bitmaps[dim]:
+                    np.bitwise_or(dim_mask, self.bitmaps[dim][value], out=dim_mask)
+            combined = dim_mask if combined is None else np.bitwise_and(combined, dim_mask, out=combined)
+
+        self._cache[key] = combined
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return combined
+
+    def positions(self, filters, lo=0, hi=None):
+        """Row positions in [lo, hi) matching the filters, unpacking only that byte range"""
+        hi = self.n_rows if hi is None else hi
+        packed = self.mask(filters)
+        if packed is None:
+            return np.arange(lo, hi)
+        first_byte = lo // 8
+        bits = np.unpackbits(packed[first_byte:(hi + 7) // 8])
+        offset = lo - first_byte * 8
+        return np.flatnonzero(bits[offset:offset + hi - lo]) + lo
+
+    def filter(self, df, filters, lo=0, hi=None):
+        """Rows of ``df`` in [lo, hi) matching the filters; a plain slice when unrestricted"""
+        hi = self.n_rows if hi is None else hi
+        if self.mask(filters) is None:
+            return df.iloc[lo:hi]
+        return df.iloc[self.positions(filters, lo, hi)]
+
+
+class PrefixSumIndex:
+    """Cumulative sums along the time axis of every leaf slice
+
+    The total of any date range is one subtraction per slice, whatever the
+    range length. Totals for a group or a filtered segment add up those
+    differences over the matching leaves, so their cost depends on the number
+    of slices, not on the number of rows in the range.
+    """
+
+    def __init__(self, keys, periods, values, counts):
+        self.keys = keys.reset_index(drop=True)
+        self.periods = pd.DatetimeIndex(periods)
+        self.dates = self.periods.to_numpy(dtype='datetime64[ns]')
+        self.dims = [col for col in keys.columns if col != 'Level']
+        # Leading zero column: the total over periods [lo, hi) is prefix[:, hi] - prefix[:, lo]
+        self.prefix = {measure: cumulative_columns(block) for measure, block in values.items()}
+        self.count_prefix = cumulative_columns(counts)
+        self._codes = {dim: pd.factorize(self.keys[dim], sort=True) for dim in self.dims}
+
+    @classmethod
+    def from_cube(cls, cube):
+        return cls(cube.keys, cube.periods, cube.values, cube.counts)
+
+    def _mask(self, filters):
+        """Leaf slices matching ``{dim: [values]}``"""
+        mask = np.ones(len(self.keys), dtype=bool)
+        for dim, values in (filters or {}).items():
+            if values is not None:
+                mask &= self.keys[dim].isin(list(values)).to_numpy()
+        return mask
+
+    def range_totals(self, measure, start=None, end=None):
+        """Total of ``measure`` over [start, end] for every leaf slice"""
+        lo, hi = date_bounds(self.dates, start, end)
+        prefix = self.prefix[measure]
+        return prefix[:, hi] - prefix[:, lo]
+
+    def range_counts(self, start=None, end=None):
+        """Rows within [start, end] for every leaf slice"""
+        lo, hi = date_bounds(self.dates, start, end)
+        return self.count_prefix[:, hi] - self.count_prefix[:, lo]
+
+    def totals(self, measure, start=None, end=None, by=None, filters=None):
+        """Range total overall, or per value of ``by`` with matching slices, over the slices matching ``filters``"""
+        mask = self._mask(filters)
+        per_slice = self.range_totals(measure, start, end)[mask]
+        if by is None:
+            return float(per_slice.sum())
+        codes, labels = self._codes[by]
+        sums = np.bincount(codes[mask], weights=per_slice, minlength=len(labels))
+        present = np.bincount(codes[mask], minlength=len(labels)) > 0
+        return pd.Series(sums[present], index=pd.Index(np.asarray(labels)[present], name=by), name=measure)
+
+    def group_stats(self, measure, by, start=None, end=None, filters=None):
+        """Sum, mean, count and share per group, laid out like ``sampling.exact_groups``"""
+        mask = self._mask(filters)
+        codes, labels = self._codes[by]
+        sums = np.bincount(codes[mask], weights=self.range_totals(measure, start, end)[mask], minlength=len(labels))
+        counts = np.bincount(codes[mask], weights=self.range_counts(start, end)[mask], minlength=len(labels))
+        present = counts > 0
+        return exact_table(sums[present], counts[present], pd.Index(np.asarray(labels)[present], name=by))
+
+    def compare(self, measure, base, current, by, filters=None):
+        """Totals of two (start, end) periods per value of ``by``, with absolute and percentage change"""
+        comparison = pd.DataFrame({
+            'Base': self.totals(measure, *base, by=by, filters=filters),
+            'Current': self.totals(measure, *current, by=by, filters=filters),
+        })
+        comparison['Change'] = comparison['Current'] - comparison['Base']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            comparison['Change_Pct'] = (comparison['Current'] / comparison['Base'] - 1) * 100
+        comparison['Change_Pct'] = comparison['Change_Pct'].where(np.isfinite(comparison['Change_Pct']))
+        return comparison
+
+
+def load_prefix_sum_index(detailed_df, source_path, measures=MEASURES):
+    """Persisted prefix sums over every leaf (all-dimension) slice"""
+
+    def compute():
+        cube = SeriesCube.from_frame(detailed_df, sets=[tuple(DIMENSIONS)], measures=measures)
+        return PrefixSumIndex.from_cube(cube)
+
+    return cached_result(result_key('prefix_sums', tuple(measures)), [source_path], compute)
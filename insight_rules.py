@@ -0,0 +1,148 @@
+"""
+Credit Card Spending Analysis - Insight Rules
+=============================================
+
+Declarative insight rules evaluated in one batch against named aggregates.
+Each aggregate (e.g. ``spending_by_City``) is built once from the cached
+rollups and shared by every rule that references it, so adding a rule never
+adds a scan of the detailed data. Evaluation returns structured records
+(rule id, slice, metric, value, message) rather than printed strings.
+"""
+
+import operator
+
+import pandas as pd
+
+from cube import ALL
+
+MEASURE = 'Spending_Amount_Thousands_INR'
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    'between': lambda values, bounds: (values > bounds[0]) & (values <= bounds[1]),
+}
+
+
+class AggregateCatalog:
+    """Named aggregates, each computed at most once and shared by all rules"""
+
+    def __init__(self):
+        self._builders = {}
+        self._values = {}
+
+    def register(self, name, builder):
+        """Register a zero-argument callable returning a Series indexed by slice"""
+        self._builders[name] = builder
+        self._values.pop(name, None)
+
+    def names(self):
+        return list(self._builders)
+
+    def get(self, name):
+        if name not in self._values:
+            if name not in self._builders:
+                raise KeyError(f"Unknown aggregate: {name}")
+            self._values[name] = self._builders[name]()
+        return self._values[name]
+
+
+class InsightRule:
+    """A condition over one named aggregate and the message it produces"""
+
+    def __init__(self, rule_id, aggregate, message, op=None, threshold=None, select='all'):
+        if op is not None and op not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+        if select not in ('all', 'max', 'min'):
+            raise ValueError(f"Unsupported selection: {select}")
+        self.rule_id = rule_id
+        self.aggregate = aggregate
+        self.message = message
+        self.op = op
+        self.threshold = threshold
+        self.select = select
+
+    def evaluate(self, values):
+        """Slices of ``values`` that satisfy the rule"""
+        values = values.dropna()
+        if self.select == 'max' and len(values):
+            values = values.loc[[values.idxmax()]]
+        elif self.select == 'min' and len(values):
+            values = values.loc[[values.idxmin()]]
+        if self.op is not None:
+            values = values[OPERATORS[self.op](values, self.threshold)]
+        return values
+
+
+def _level_series(cube, level, values):
+    mask = cube.level(level)
+    return pd.Series(values[mask], index=cube.keys.loc[mask, level].to_numpy(), name=level)
+
+
+def default_catalog(main_df, cube, window_metrics, dims=('Category', 'City', 'Age_Group', 'Gender', 'Card_Type')):
+    """Aggregates over the main series and the cached rollups"""
+    catalog = AggregateCatalog()
+    totals = cube.period_totals(MEASURE)
+
+    catalog.register(
+        'latest_yoy_growth',
+        lambda: pd.Series({ALL: main_df['YoY_Growth_Spending'].dropna().iloc[-1]})
+    )
+    catalog.register(
+        'avg_spending_by_month',
+        lambda: main_df.groupby('Month')['Total_Spending_Billion_INR'].mean().rename(
+            index=lambda m: pd.Timestamp(2024, m, 1).strftime('%B'))
+    )
+
+    for dim in dims:
+        catalog.register(f'spending_by_{dim}', lambda dim=dim: _level_series(cube, dim, totals))
+        catalog.register(
+            f'spending_share_by_{dim}',
+            lambda dim=dim: catalog.get(f'spending_by_{dim}') / catalog.get(f'spending_by_{dim}').sum() * 100
+        )
+        catalog.register(
+            f'yoy_growth_by_{dim}',
+            lambda dim=dim: window_metrics.snapshot(MEASURE, level=dim).set_index(dim)['YoY_Growth']
+        )
+
+    return catalog
+
+
+DEFAULT_RULES = [
+    InsightRule('growth_strong', 'latest_yoy_growth',
+                "🚀 Experiencing strong double-digit growth in card spending", op='>', threshold=20),
+    InsightRule('growth_healthy', 'latest_yoy_growth',
+                "📈 Maintaining healthy growth momentum", op='between', threshold=(10, 20)),
+    InsightRule('growth_stable', 'latest_yoy_growth',
+                "📊 Growth is stabilizing", op='<=', threshold=10),
+    InsightRule('top_category', 'spending_by_Category',
+                "🛍️ '{slice}' dominates spending categories", select='max'),
+    InsightRule('top_age_group', 'spending_by_Age_Group',
+                "👥 '{slice}' age group shows highest spending", select='max'),
+    InsightRule('top_city', 'spending_by_City',
+                "🏙️ '{slice}' leads in total card spending", select='max'),
+    InsightRule('peak_month', 'avg_spending_by_month',
+                "🗓️ '{slice}' shows peak seasonal spending", select='max'),
+    InsightRule('category_surge', 'yoy_growth_by_Category',
+                "⚡ '{slice}' spending is up {value:.1f}% year-over-year", op='>', threshold=15),
+    InsightRule('city_decline', 'yoy_growth_by_City',
+                "📉 '{slice}' spending is down {value:.1f}% year-over-year", op='<', threshold=0),
+]
+
+
+def evaluate_rules(rules, catalog):
+    """Evaluate all rules in one batch, returning one record per triggered slice"""
+    records = []
+    for rule in rules:
+        matched = rule.evaluate(catalog.get(rule.aggregate))
+        for slice_label, value in matched.items():
+            records.append({
+                'rule_id': rule.rule_id,
+                'slice': slice_label,
+                'metric': rule.aggregate,
+                'value': float(value),
+                'message': rule.message.format(slice=slice_label, value=value),
+            })
+    return pd.DataFrame(records, columns=['rule_id', 'slice', 'metric', 'value', 'message'])
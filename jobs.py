@@ -0,0 +1,178 @@
+"""
+Credit Card Spending Analysis - Background Jobs
+===============================================
+
+Process-pool executor that keeps heavy model fits (forecasting, segmentation,
+anomaly detection) off the Streamlit script thread. Jobs are keyed like the
+dashboard's aggregates: an identical job already in flight is joined instead
+of resubmitted, and finished results are published into the AggregateCache,
+where the next rerun finds them. Every job has a timeout and a set of owning
+sessions, so a session can drop the jobs its old filters started.
+
+Each job runs in its own spawned worker process, at most ``max_workers`` at
+a time, with later jobs queued. A job that times out, or that no session
+waits for any more, has its process terminated, so an abandoned model fit
+never holds a worker slot ahead of the jobs for the current filters.
+"""
+
+import multiprocessing
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+from indexes import DateRangeIndex
+from modeling import detect_anomalies, forecast_spending, segment_customers
+from shared_data import load_dataset
+
+
+def _load_filtered(path, filters=None, start=None, end=None):
+    """Dataset rows within [start, end] matching ``{dim: [values]}`` filters"""
+    df = DateRangeIndex(load_dataset(path)).slice(start, end)
+    for dim, values in (filters or {}).items():
+        df = df[df[dim].isin(list(values))]
+    return df
+
+
+def forecast_job(main_path, start=None, end=None, horizon=6):
+    df = _load_filtered(main_path, start=start, end=end)
+    if len(df) < 24:
+        raise ValueError("Forecasting needs at least 24 months in the selected range")
+    return forecast_spending(df, horizon=horizon, test_months=min(12, len(df) // 3))
+
+
+def segmentation_job(detailed_path, filters=None, start=None, end=None, n_clusters=4):
+    return segment_customers(_load_filtered(detailed_path, filters, start, end), n_clusters=n_clusters)
+
+
+def anomaly_job(detailed_path, dims=('Category',), filters=None, start=None, end=None, threshold=3.5):
+    df = _load_filtered(detailed_path, filters, start, end)
+    if df.empty:
+        return pd.DataFrame(columns=['Segment', 'Date', 'Observed', 'Expected', 'Z_Score'])
+    return detect_anomalies(df, dims=dims, threshold=threshold)
+
+
+def _run_job(conn, fn, args, kwargs):
+    """Worker process entry point: send ('done', result) or ('failed', message) back to the server"""
+    try:
+        conn.send(('done', fn(*args, **kwargs)))
+    except Exception as exc:
+        conn.send(('failed', str(exc)))
+    finally:
+        conn.close()
+
+
+class BackgroundJobs:
+    """Deduplicating job runner, one terminable worker process per job, publishing into an AggregateCache"""
+
+    def __init__(self, cache, max_workers=2):
+        self.cache = cache
+        self.max_workers = max_workers
+        self._context = multiprocessing.get_context('spawn')
+        self._jobs = {}
+        self._queue = deque()
+        self._lock = threading.RLock()
+
+    def submit(self, key, fn, *args, timeout=120, owner=None, retry=False, **kwargs):
+        """Run ``fn(*args, **kwargs)`` for ``key`` unless it is cached or already in flight
+
+        A failed or timed-out job keeps its status (so reruns do not loop on a
+        job that always fails) until it is submitted again with ``retry=True``.
+        """
+        if self.cache.get(key) is not None:
+            return self.status(key)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job['state'] in ('queued', 'running'):
+                job['owners'].add(owner)
+            elif job is None or job['state'] == 'cancelled' or (retry and job['state'] in ('failed', 'timeout')):
+                self._jobs[key] = {'call': (fn, args, kwargs), 'queued': time.monotonic(), 'started': None,
+                                   'timeout': timeout, 'owners': {owner}, 'state': 'queued', 'error': None,
+                                   'process': None}
+                self._queue.append(key)
+                self._start_queued()
+        return self.status(key)
+
+    def _start_queued(self):
+        """Start queued jobs while fewer than ``max_workers`` processes are running"""
+        with self._lock:
+            running = sum(job['state'] == 'running' for job in self._jobs.values())
+            while self._queue and running < self.max_workers:
+                key = self._queue.popleft()
+                job = self._jobs.get(key)
+                if job is None or job['state'] != 'queued':
+                    continue
+                receiver, sender = self._context.Pipe(duplex=False)
+                fn, args, kwargs = job['call']
+                process = self._context.Process(target=_run_job, args=(sender, fn, args, kwargs), daemon=True)
+                process.start()
+                sender.close()
+                job.update(state='running', started=time.monotonic(), process=process)
+                running += 1
+                threading.Thread(target=self._watch, args=(key, job, receiver), daemon=True).start()
+
+    def _watch(self, key, job, receiver):
+        """Wait for a job's result until its deadline, then publish it or terminate the process"""
+        try:
+            message = receiver.recv() if receiver.poll(job['timeout']) else None
+        except (EOFError, OSError):
+            message = ('failed', "Worker exited without a result")
+        finally:
+            receiver.close()
+        process = job['process']
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+        with self._lock:
+            # A job that was cancelled or replaced in the meantime is no longer tracked under ``key``
+            if self._jobs.get(key) is job and job['state'] == 'running':
+                if message is None:
+                    job['state'], job['error'] = 'timeout', f"No result after {job['timeout']}s"
+                elif message[0] == 'done':
+                    self.cache.put(key, message[1])
+                    del self._jobs[key]
+                else:
+                    job['state'], job['error'] = 'failed', message[1]
+            self._start_queued()
+
+    def status(self, key):
+        """State of a job: done (with result), queued, running, failed, timeout, cancelled or missing"""
+        result = self.cache.get(key)
+        if result is not None:
+            return {'state': 'done', 'result': result}
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return {'state': 'missing'}
+            # The timeout counts from the start of the worker process, not from queueing
+            elapsed = time.monotonic() - (job['started'] or job['queued'])
+            return {'state': job['state'], 'elapsed': elapsed, 'timeout': job['timeout'], 'error': job['error']}
+
+    def cancel(self, owner, keep=()):
+        """Release ``owner``'s jobs except ``keep``; jobs nobody else waits for are cancelled
+
+        A cancelled running job's process is terminated, freeing its slot for the next queued job.
+        """
+        keep = set(keep)
+        with self._lock:
+            for key, job in list(self._jobs.items()):
+                if key in keep or owner not in job['owners']:
+                    continue
+                job['owners'].discard(owner)
+                if not job['owners']:
+                    if job['state'] == 'running':
+                        job['process'].terminate()
+                    job['state'] = 'cancelled'
+                    del self._jobs[key]
+            self._start_queued()
+
+    def shutdown(self):
+        with self._lock:
+            self._queue.clear()
+            for job in self._jobs.values():
+                if job['state'] == 'running':
+                    job['process'].terminate()
+                    job['state'] = 'cancelled'
+            self._jobs.clear()
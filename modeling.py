@@ -0,0 +1,116 @@
+"""
+Credit Card Spending Analysis - Forecasting, Segmentation and Anomalies
+=======================================================================
+
+Model fits shared by the analysis script and the dashboard's background jobs.
+Every function takes plain DataFrames and returns plain results, so it can run
+in a worker process and its output can be pickled into the caches.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.preprocessing import StandardScaler
+
+from cube import SeriesCube, slice_labels
+from decomposition import decompose
+
+FORECAST_FEATURES = ['Days_Since_Start', 'Month_Sin', 'Month_Cos', 'Active_Cards_Millions', 'Seasonal_Factor']
+FORECAST_TARGET = 'Total_Spending_Billion_INR'
+
+SEGMENT_FEATURES = ['Spending_Amount_Thousands_INR_mean', 'Spending_Amount_Thousands_INR_sum',
+                    'Transaction_Count_mean', 'Avg_Transaction_Amount_INR_mean']
+
+
+def forecast_features(main_df):
+    """Time-based and seasonal features for the forecasting model"""
+    df = main_df.sort_values('Date').reset_index(drop=True)
+    df['Days_Since_Start'] = (df['Date'] - df['Date'].min()).dt.days
+    df['Month_Sin'] = np.sin(2 * np.pi * df['Month'] / 12)
+    df['Month_Cos'] = np.cos(2 * np.pi * df['Month'] / 12)
+    return df
+
+
+def forecast_spending(main_df, horizon=6, test_months=12, n_estimators=100, random_state=42):
+    """Random Forest spending model: hold-out metrics, feature importance and a forecast"""
+    df = forecast_features(main_df)
+    X = df[FORECAST_FEATURES].bfill()
+    y = df[FORECAST_TARGET]
+
+    # Train-test split (use the last ``test_months`` as test)
+    split_idx = len(X) - test_months
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state)
+    model.fit(X[:split_idx], y[:split_idx])
+    y_pred = model.predict(X[split_idx:])
+    y_test = y[split_idx:]
+
+    importance = pd.DataFrame({
+        'feature': FORECAST_FEATURES,
+        'importance': model.feature_importances_
+    }).sort_values('importance', ascending=False)
+
+    # Future months assume 1% card growth and a festival-season factor
+    last_date = df['Date'].max()
+    future_dates = [last_date + pd.DateOffset(months=i) for i in range(1, horizon + 1)]
+    future_X = pd.DataFrame({
+        'Days_Since_Start': [(d - df['Date'].min()).days for d in future_dates],
+        'Month_Sin': [np.sin(2 * np.pi * d.month / 12) for d in future_dates],
+        'Month_Cos': [np.cos(2 * np.pi * d.month / 12) for d in future_dates],
+        'Active_Cards_Millions': df['Active_Cards_Millions'].iloc[-1] * (1 + 0.01),
+        'Seasonal_Factor': [1.1 if d.month in [10, 11, 12] else 1.0 for d in future_dates],
+    })
+
+    return {
+        'mae': mean_absolute_error(y_test, y_pred),
+        'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
+        'r2': r2_score(y_test, y_pred),
+        'importance': importance,
+        'test': pd.DataFrame({'Date': df['Date'][split_idx:], 'Actual': y_test, 'Predicted': y_pred}),
+        'forecast': pd.DataFrame({'Date': future_dates, 'Forecast': model.predict(future_X)}),
+    }
+
+
+def segment_customers(detailed_df, n_clusters=4, random_state=42):
+    """K-means clusters of Age_Group x Gender x Card_Type segments by spending behaviour"""
+    segment_data = detailed_df.groupby(['Age_Group', 'Gender', 'Card_Type']).agg({
+        'Spending_Amount_Thousands_INR': ['mean', 'sum', 'count'],
+        'Transaction_Count': 'mean',
+        'Avg_Transaction_Amount_INR': 'mean'
+    }).round(2)
+
+    # Flatten column names
+    segment_data.columns = ['_'.join(col) for col in segment_data.columns]
+    segment_data = segment_data.reset_index()
+
+    X_scaled = StandardScaler().fit_transform(segment_data[SEGMENT_FEATURES].fillna(0))
+    n_clusters = min(n_clusters, len(segment_data))
+    segment_data['Cluster'] = KMeans(n_clusters=n_clusters, random_state=random_state).fit_predict(X_scaled)
+    return segment_data
+
+
+def detect_anomalies(detailed_df, dims=('Category',), measure='Spending_Amount_Thousands_INR', threshold=3.5):
+    """Months whose decomposition residual is a robust outlier within its series
+
+    Residuals are scored with a median/MAD z-score per series; months with
+    ``|z| > threshold`` are returned, most extreme first.
+    """
+    cube = SeriesCube.from_frame(detailed_df, sets=[tuple(dims)], measures=[measure])
+    decomposition = decompose(cube, measure)
+    residual = decomposition.residual
+
+    median = np.nanmedian(residual, axis=1, keepdims=True)
+    mad = 1.4826 * np.nanmedian(np.abs(residual - median), axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (residual - median) / mad
+    series_idx, period_idx = np.nonzero(np.abs(np.nan_to_num(z)) > threshold)
+
+    anomalies = pd.DataFrame({
+        'Segment': slice_labels(cube.keys, list(dims)).to_numpy()[series_idx],
+        'Date': cube.periods[period_idx],
+        'Observed': decomposition.observed[series_idx, period_idx],
+        'Expected': (decomposition.trend * decomposition.seasonal)[series_idx, period_idx],
+        'Z_Score': z[series_idx, period_idx],
+    })
+    return anomalies.reindex(anomalies['Z_Score'].abs().sort_values(ascending=False).index).reset_index(drop=True)
@@ -0,0 +1,154 @@
+"""
+Credit Card Spending Analysis - Approximate Query Mode
+======================================================
+
+Stratified sample of the detailed dataset (Category x City x Date strata by
+default) with design-based estimators for sums, means and shares and their
+confidence intervals. ``choose_mode`` decides between the sample and an exact
+computation from the requested mode and the predicted exact cost.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+STRATA = ('Category', 'City', 'Date')
+
+# Below this many rows an exact answer is cheap enough to always prefer
+EXACT_ROW_THRESHOLD = 2_000_000
+
+MODES = ['auto', 'exact', 'approximate']
+
+
+def choose_mode(requested, predicted_rows, exact_row_threshold=EXACT_ROW_THRESHOLD):
+    """Resolve 'auto' to 'exact' or 'approximate' from the predicted exact cost"""
+    if requested not in MODES:
+        raise ValueError(f"Unknown execution mode: {requested}")
+    if requested == 'auto':
+        return 'exact' if predicted_rows <= exact_row_threshold else 'approximate'
+    return requested
+
+
+class StratifiedSample:
+    """Per-stratum simple random sample with expansion weights"""
+
+    def __init__(self, df, strata=STRATA, fraction=0.1, min_per_stratum=2, seed=42):
+        strata = list(strata)
+        stratum_idx, _ = pd.MultiIndex.from_frame(df[strata]).factorize()
+        population = np.bincount(stratum_idx)
+        target = np.minimum(population, np.maximum(np.ceil(population * fraction), min_per_stratum)).astype(np.int64)
+
+        # Random order within each stratum, then keep the first n_h rows of each
+        rng = np.random.default_rng(seed)
+        order = np.lexsort((rng.random(len(df)), stratum_idx))
+        sorted_strata = stratum_idx[order]
+        starts = np.cumsum(population) - population
+        rank = np.arange(len(df)) - starts[sorted_strata]
+        chosen = np.sort(order[rank < target[sorted_strata]])
+
+        self.strata = strata
+        self.fraction = fraction
+        self.population_rows = len(df)
+        self.sample = df.iloc[chosen].reset_index(drop=True)
+        self.stratum = stratum_idx[chosen]
+        self.population_sizes = population.astype(float)
+        self.sample_sizes = target.astype(float)
+
+    def __len__(self):
+        return len(self.sample)
+
+    def _domain(self, filters=None, start=None, end=None):
+        """Boolean mask of sample rows inside the queried domain"""
+        mask = np.ones(len(self.sample), dtype=bool)
+        for dim, values in (filters or {}).items():
+            if values is not None:
+                mask &= self.sample[dim].isin(list(values)).to_numpy()
+        if start is not None:
+            mask &= (self.sample['Date'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            end_exclusive = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+            mask &= (self.sample['Date'] < end_exclusive).to_numpy()
+        return mask
+
+    def _variance(self, sum_z, sumsq_z):
+        """Stratified variance of an estimated total from per-(stratum, group) sums of z and z^2"""
+        n = self.sample_sizes[:, None]
+        N = self.population_sizes[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s2 = np.where(n > 1, (sumsq_z - sum_z ** 2 / n) / (n - 1), 0.0)
+            coef = np.where(n > 0, N ** 2 * (1 - n / N) / n, 0.0)
+        return np.maximum((coef * s2).sum(axis=0), 0.0)
+
+    def estimate_groups(self, measure, by=None, filters=None, start=None, end=None, confidence=0.95, groups=None):
+        """Estimated sum, mean and share of ``measure`` per group with CI half-widths
+
+        ``groups`` optionally supplies precomputed ``(codes, labels)`` for every
+        sample row (e.g. a geographic rollup of City) instead of a ``by`` column.
+        """
+        domain = self._domain(filters, start, end)
+        y = self.sample[measure].to_numpy(dtype=float)[domain]
+        h = self.stratum[domain]
+        if groups is not None:
+            codes, labels = groups
+            group_idx = np.asarray(codes)[domain]
+        elif by is None:
+            group_idx, labels = np.zeros(len(y), dtype=np.int64), pd.Index(['All'])
+        else:
+            group_idx, labels = pd.factorize(self.sample[by].to_numpy()[domain], sort=True)
+        n_strata, n_groups = len(self.population_sizes), len(labels)
+        weights = (self.population_sizes / self.sample_sizes)[h]
+
+        cell = h * n_groups + group_idx
+        size = n_strata * n_groups
+
+        def per_cell(values):
+            return np.bincount(cell, weights=values, minlength=size).reshape(n_strata, n_groups)
+
+        c1, s1, s2 = per_cell(np.ones_like(y)), per_cell(y), per_cell(y ** 2)
+
+        totals = np.bincount(group_idx, weights=weights * y, minlength=n_groups)
+        counts = np.bincount(group_idx, weights=weights, minlength=n_groups)
+        grand_total = totals.sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = totals / counts
+            shares = totals / grand_total
+
+        # Linearized variances: total (z = y), mean (z = y - mean), share (z = (y_g - share * y) / T)
+        var_total = self._variance(s1, s2)
+        var_mean = self._variance(s1 - means * c1, s2 - 2 * means * s1 + means ** 2 * c1) / counts ** 2
+        s1_all, s2_all = s1.sum(axis=1, keepdims=True), s2.sum(axis=1, keepdims=True)
+        var_share = self._variance(
+            s1 - shares * s1_all,
+            s2 - 2 * shares * s2 + shares ** 2 * s2_all
+        ) / grand_total ** 2
+
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        estimates = pd.DataFrame({
+            'sum': totals,
+            'sum_ci': z * np.sqrt(var_total),
+            'mean': means,
+            'mean_ci': z * np.sqrt(var_mean),
+            'count': counts,
+            'percentage': shares * 100,
+            'percentage_ci': z * np.sqrt(var_share) * 100,
+        }, index=pd.Index(labels, name=by))
+        # Supplied labels may include groups with no sample rows in the domain
+        return estimates[counts > 0]
+
+
+def exact_table(sums, counts, index):
+    """Exact per-group sums and row counts in the ``estimate_groups`` layout (zero-width intervals)"""
+    grouped = pd.DataFrame({'sum': np.asarray(sums, dtype=float), 'count': np.asarray(counts).astype(np.int64)},
+                           index=index)
+    grouped['mean'] = grouped['sum'] / grouped['count']
+    grouped['percentage'] = grouped['sum'] / grouped['sum'].sum() * 100
+    for col in ['sum_ci', 'mean_ci', 'percentage_ci']:
+        grouped[col] = 0.0
+    return grouped[['sum', 'sum_ci', 'mean', 'mean_ci', 'count', 'percentage', 'percentage_ci']]
+
+
+def exact_groups(df, measure, by):
+    """Exact counterpart of ``estimate_groups`` (zero-width intervals)"""
+    grouped = df.groupby(by)[measure].agg(['sum', 'count'])
+    return exact_table(grouped['sum'].to_numpy(), grouped['count'].to_numpy(), grouped.index)
@@ -0,0 +1,43 @@
+"""
+Credit Card Spending Analysis - Shared Datasets
+===============================================
+
+Datasets are parsed once per server process and handed to every dashboard
+session as zero-copy views. Views are shallow copies under pandas
+Copy-on-Write: they share the parsed column buffers, and a session that
+modifies its view copies only the columns it touches, so the shared frame is
+never changed and per-session memory grows only with that session's results.
+Parsed datasets are also persisted (Feather when pyarrow is installed), so a
+restarted server skips CSV parsing.
+"""
+
+import os
+
+import pandas as pd
+
+from store import cached_frame, result_key
+
+# Copy-on-Write is always on from pandas 3.0; opt in explicitly on 2.x
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+def read_dataset(path, date_col='Date'):
+    """Parse a CSV with its date column, sorted by date so date filters are binary searches"""
+    df = pd.read_csv(path)
+    df[date_col] = pd.to_datetime(df[date_col])
+    return df.sort_values(date_col, kind='stable', ignore_index=True)
+
+
+def load_dataset(path, date_col='Date'):
+    """``read_dataset`` backed by the persistent cache, invalidated when the CSV changes"""
+    return cached_frame(
+        result_key('dataset', os.path.abspath(path), date_col),
+        [path],
+        lambda: read_dataset(path, date_col)
+    )
+
+
+def shared_view(df):
+    """Zero-copy view of a shared frame that copies on its first in-place write"""
+    return df.copy(deep=False)
@@ -0,0 +1,200 @@
+"""
+Credit Card Spending Analysis - Significance Testing
+====================================================
+
+Tests whether spending differs between the groups of a demographic dimension
+(Age_Group, Gender, Card_Type) within every Category x City slice. One-way
+ANOVA, Welch's ANOVA and Kruskal-Wallis are computed for all slices at once
+from per-(slice, group) sufficient statistics built with ``np.bincount``, and
+p-values are corrected for multiple comparisons across the whole table.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from cube import encode_columns
+
+TEST_DIMENSIONS = ['Age_Group', 'Gender', 'Card_Type']
+TESTS = ['anova', 'welch', 'kruskal']
+
+
+def _slice_codes(df, slice_dims):
+    """Compact integer code per row for the slice it belongs to, plus slice keys"""
+    codes, labels = encode_columns(df, slice_dims)
+    slice_code = np.zeros(len(df), dtype=np.int64)
+    for dim in slice_dims:
+        slice_code = slice_code * len(labels[dim]) + codes[dim]
+    observed, slice_idx = np.unique(slice_code, return_inverse=True)
+
+    keys = pd.DataFrame(index=range(len(observed)))
+    remainder = observed.copy()
+    for dim in reversed(slice_dims):
+        radix = len(labels[dim])
+        keys[dim] = np.asarray(labels[dim])[remainder % radix]
+        remainder //= radix
+    return slice_idx, keys[list(slice_dims)]
+
+
+def _group_moments(values, slice_idx, group_idx, n_slices, n_groups):
+    """Count, mean and variance per (slice, group) as (n_slices x n_groups) arrays"""
+    cell = slice_idx * n_groups + group_idx
+    size = n_slices * n_groups
+
+    # Centre on the slice mean to keep the sum-of-squares numerically stable
+    slice_n = np.bincount(slice_idx, minlength=n_slices)
+    slice_mean = np.bincount(slice_idx, weights=values, minlength=n_slices) / np.maximum(slice_n, 1)
+    centred = values - slice_mean[slice_idx]
+
+    n = np.bincount(cell, minlength=size).reshape(n_slices, n_groups).astype(float)
+    s1 = np.bincount(cell, weights=centred, minlength=size).reshape(n_slices, n_groups)
+    s2 = np.bincount(cell, weights=centred ** 2, minlength=size).reshape(n_slices, n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s1 / n
+        ss_within = s2 - s1 * mean
+        var = ss_within / (n - 1)
+    return n, mean, np.where(n > 0, ss_within, 0.0), var
+
+
+def anova(n, mean, ss_within):
+    """Vectorized one-way ANOVA F-test per slice"""
+    present = n > 0
+    k = present.sum(axis=1)
+    total_n = n.sum(axis=1)
+    grand_mean = np.nansum(np.where(present, n * mean, 0.0), axis=1) / total_n
+    ss_between = np.nansum(np.where(present, n * (mean - grand_mean[:, None]) ** 2, 0.0), axis=1)
+    df1, df2 = k - 1, total_n - k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_stat = (ss_between / df1) / (ss_within.sum(axis=1) / df2)
+    valid = (df1 > 0) & (df2 > 0)
+    f_stat = np.where(valid, f_stat, np.nan)
+    return f_stat, df1.astype(float), df2.astype(float), stats.f.sf(f_stat, df1, df2)
+
+
+def welch_anova(n, mean, var):
+    """Vectorized Welch's ANOVA per slice (equals Welch's t-test squared for two groups)"""
+    usable = (n >= 2) & (var > 0)
+    k = usable.sum(axis=1).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w = np.where(usable, n / var, 0.0)
+        w_total = w.sum(axis=1)
+        weighted_mean = np.nansum(np.where(usable, w * mean, 0.0), axis=1) / w_total
+        a = np.nansum(np.where(usable, w * (mean - weighted_mean[:, None]) ** 2, 0.0), axis=1) / (k - 1)
+        lam = np.nansum(np.where(usable, (1 - w / w_total[:, None]) ** 2 / (n - 1), 0.0), axis=1)
+        b = 1 + 2 * (k - 2) / (k ** 2 - 1) * lam
+        f_stat = a / b
+        df2 = (k ** 2 - 1) / (3 * lam)
+    valid = k >= 2
+    f_stat = np.where(valid, f_stat, np.nan)
+    df1 = np.where(valid, k - 1, np.nan)
+    df2 = np.where(valid, df2, np.nan)
+    return f_stat, df1, df2, stats.f.sf(f_stat, df1, df2)
+
+
+def slice_ranks(values, slice_idx, n_slices):
+    """Average ranks within each slice and the per-slice tie correction factor"""
+    ranks = pd.Series(values).groupby(slice_idx).rank(method='average').to_numpy()
+
+    # 1 - sum(t^3 - t) / (N^3 - N) over runs of equal values in each slice
+    ties = pd.DataFrame({'slice': slice_idx, 'value': values}).groupby(['slice', 'value']).size()
+    t = ties.to_numpy(dtype=float)
+    tie_term = np.bincount(ties.index.get_level_values('slice'), weights=t ** 3 - t, minlength=n_slices)
+    total_n = np.bincount(slice_idx, minlength=n_slices).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tie_correction = 1 - tie_term / (total_n ** 3 - total_n)
+    return ranks, tie_correction
+
+
+def kruskal_wallis(ranks, tie_correction, slice_idx, group_idx, n_slices, n_groups, n):
+    """Vectorized Kruskal-Wallis H-test per slice with tie correction"""
+    cell = slice_idx * n_groups + group_idx
+    rank_sums = np.bincount(cell, weights=ranks, minlength=n_slices * n_groups).reshape(n_slices, n_groups)
+
+    total_n = n.sum(axis=1)
+    present = n > 0
+    k = present.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = 12 / (total_n * (total_n + 1)) * np.where(present, rank_sums ** 2 / n, 0.0).sum(axis=1) - 3 * (total_n + 1)
+        h = h / tie_correction
+
+    df = (k - 1).astype(float)
+    valid = (k >= 2) & (tie_correction > 0)
+    h = np.where(valid, h, np.nan)
+    return h, df, np.full(n_slices, np.nan), stats.chi2.sf(h, df)
+
+
+def adjust_pvalues(p_values, method='fdr_bh'):
+    """Benjamini-Hochberg or Bonferroni correction, ignoring NaNs"""
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full(p_values.shape, np.nan)
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    m = len(p)
+    if m == 0:
+        return adjusted
+    if method == 'bonferroni':
+        adjusted[valid] = np.minimum(p * m, 1.0)
+    elif method == 'fdr_bh':
+        order = np.argsort(p)
+        scaled = p[order] * m / np.arange(1, m + 1)
+        scaled = np.minimum.accumulate(scaled[::-1])[::-1]
+        result = np.empty(m)
+        result[order] = np.minimum(scaled, 1.0)
+        adjusted[valid] = result
+    else:
+        raise ValueError(f"Unknown correction method: {method}")
+    return adjusted
+
+
+def significance_table(df, measure='Spending_Amount_Thousands_INR', dimensions=TEST_DIMENSIONS,
+                       slice_dims=('Category', 'City'), tests=TESTS, correction='fdr_bh', alpha=0.05):
+    """Run every test for every dimension across every slice and correct the p-values"""
+    values = df[measure].to_numpy(dtype=float)
+    slice_idx, keys = _slice_codes(df, list(slice_dims))
+    n_slices = len(keys)
+    if 'kruskal' in tests:
+        ranks, tie_correction = slice_ranks(values, slice_idx, n_slices)
+
+    frames = []
+    for dim in dimensions:
+        group_idx, group_labels = pd.factorize(df[dim], sort=True)
+        n_groups = len(group_labels)
+        n, mean, ss_within, var = _group_moments(values, slice_idx, group_idx, n_slices, n_groups)
+
+        results = {}
+        if 'anova' in tests:
+            results['ANOVA'] = anova(n, mean, ss_within)
+        if 'welch' in tests:
+            results['Welch'] = welch_anova(n, mean, var)
+        if 'kruskal' in tests:
+            results['Kruskal-Wallis'] = kruskal_wallis(
+                ranks, tie_correction, slice_idx, group_idx, n_slices, n_groups, n
+            )
+
+        # Group means (un-centred) for reporting which group is highest
+        slice_sums = np.bincount(slice_idx, weights=values, minlength=n_slices)
+        slice_mean = slice_sums / np.maximum(n.sum(axis=1), 1)
+        raw_mean = np.where(n > 0, mean + slice_mean[:, None], -np.inf)
+        top_group = np.asarray(group_labels)[np.argmax(raw_mean, axis=1)]
+
+        for test_name, (statistic, df1, df2, p_value) in results.items():
+            frame = keys.copy()
+            frame['Dimension'] = dim
+            frame['Test'] = test_name
+            frame['Statistic'] = statistic
+            frame['DF1'] = df1
+            frame['DF2'] = df2
+            frame['P_Value'] = p_value
+            frame['N'] = n.sum(axis=1).astype(int)
+            frame['Groups'] = (n > 0).sum(axis=1)
+            frame['Highest_Group'] = top_group
+            frames.append(frame)
+
+    table = pd.concat(frames, ignore_index=True)
+
+    # Correct across all slices and dimensions, separately for each test family
+    table['P_Adjusted'] = np.nan
+    for test_name, index in table.groupby('Test').groups.items():
+        table.loc[index, 'P_Adjusted'] = adjust_pvalues(table.loc[index, 'P_Value'].to_numpy(), correction)
+    table['Significant'] = table['P_Adjusted'] < alpha
+    return table
@@ -0,0 +1,429 @@
+"""
+Credit Card Spending Analysis - Streaming Sketches
+==================================================
+
+Mergeable summaries that are built in one streaming pass over the data and
+combined across chunks or worker processes by simple addition.
+
+Quantiles use a relative-error log-bucket sketch (DDSketch style): a value x
+falls in bucket ceil(log_gamma(x)), so every reported quantile is within
+``relative_accuracy`` of a true data value. Counts are kept sparsely per leaf
+slice, which lets any combination of dimension filters be answered by summing
+the matching leaves' buckets.
+
+Top-K rankings use Space-Saving counters (deterministic over-estimates with a
+per-key error, at most total / capacity) tightened by a Count-Min sketch
+(over-estimate of at most e / width * total with probability 1 - e^-depth), so
+the heaviest Category, City and Category x City groups of a continuously
+arriving feed are ranked without retaining every group.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cube import DIMENSIONS
+from store import cached_result, result_key
+
+SKETCH_MEASURES = ['Spending_Amount_Thousands_INR', 'Avg_Transaction_Amount_INR']
+
+
+class LogBuckets:
+    """Mapping between positive values and logarithmic bucket indices"""
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-3):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.min_value = min_value
+        self.offset = int(np.ceil(np.log(min_value) / self.log_gamma))
+
+    def index(self, values):
+        """Bucket index per value; values at or below ``min_value`` share bucket 0"""
+        values = np.asarray(values, dtype=float)
+        idx = np.zeros(values.shape, dtype=np.int64)
+        positive = values > self.min_value
+        idx[positive] = np.ceil(np.log(values[positive]) / self.log_gamma).astype(np.int64) - self.offset
+        return idx
+
+    def value(self, idx):
+        """Representative value of a bucket (within the relative accuracy of its members)"""
+        idx = np.asarray(idx)
+        upper = self.gamma ** (idx + self.offset)
+        return np.where(idx > 0, 2 * upper / (1 + self.gamma), 0.0)
+
+    def same_as(self, other):
+        return (self.relative_accuracy, self.min_value) == (other.relative_accuracy, other.min_value)
+
+
+def _quantiles_from_counts(buckets, bucket_idx, counts, qs):
+    """Quantiles from (bucket, count) pairs of one merged sketch"""
+    qs = np.atleast_1d(np.asarray(qs, dtype=float))
+    if not len(counts) or counts.sum() == 0:
+        return np.full(qs.shape, np.nan)
+    order = np.argsort(bucket_idx)
+    bucket_idx, counts = bucket_idx[order], counts[order]
+    cumulative = np.cumsum(counts)
+    ranks = qs * (cumulative[-1] - 1)
+    positions = np.searchsorted(cumulative, ranks, side='right')
+    return buckets.value(bucket_idx[positions])
+
+
+class QuantileSketch:
+    """Single mergeable quantile sketch over one stream of values"""
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-3):
+        self.buckets = LogBuckets(relative_accuracy, min_value)
+        self.counts = {}
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        idx, counts = np.unique(self.buckets.index(values), return_counts=True)
+        for i, c in zip(idx.tolist(), counts.tolist()):
+            self.counts[i] = self.counts.get(i, 0) + c
+        self.count += len(values)
+        return self
+
+    def merge(self, other):
+        if not self.buckets.same_as(other.buckets):
+            raise ValueError("Cannot merge sketches with different bucket parameters")
+        for i, c in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + c
+        self.count += other.count
+        return self
+
+    def quantile(self, qs):
+        idx = np.fromiter(self.counts.keys(), dtype=np.int64, count=len(self.counts))
+        counts = np.fromiter(self.counts.values(), dtype=np.int64, count=len(self.counts))
+        return _quantiles_from_counts(self.buckets, idx, counts, qs)
+
+
+class SliceSketches:
+    """Sparse quantile sketches for every leaf slice, queryable for any filter combination"""
+
+    def __init__(self, dims=tuple(DIMENSIONS) + ('Year',), measures=SKETCH_MEASURES,
+                 relative_accuracy=0.01, min_value=1e-3):
+        self.dims = list(dims)
+        self.measures = list(measures)
+        self.buckets = LogBuckets(relative_accuracy, min_value)
+        self.leaf_keys = pd.DataFrame(columns=self.dims)
+        self._leaf_ids = {}
+        # Per measure: parallel arrays (leaf id, bucket index, count), reduced on demand
+        self._entries = {m: [] for m in self.measures}
+        self._compacted = {}
+
+    def _register(self, keys):
+        """Global leaf id for each key tuple, adding unseen leaves in one batch"""
+        ids = np.empty(len(keys), dtype=np.int64)
+        new_keys = []
+        for i, key in enumerate(keys):
+            if key not in self._leaf_ids:
+                self._leaf_ids[key] = len(self._leaf_ids)
+                new_keys.append(key)
+            ids[i] = self._leaf_ids[key]
+        if new_keys:
+            added = pd.DataFrame(new_keys, columns=self.dims)
+            self.leaf_keys = added if self.leaf_keys.empty else pd.concat([self.leaf_keys, added], ignore_index=True)
+        return ids
+
+    def _leaf_codes(self, chunk):
+        """Global leaf id per chunk row"""
+        local_codes, local_keys = pd.MultiIndex.from_frame(chunk[self.dims]).factorize()
+        return self._register(list(local_keys))[local_codes]
+
+    def update(self, chunk):
+        """Add one chunk of detailed rows to the sketches"""
+        leaf = self._leaf_codes(chunk)
+        for m in self.measures:
+            values = chunk[m].to_numpy(dtype=float)
+            valid = ~np.isnan(values)
+            self._append(m, leaf[valid], self.buckets.index(values[valid]), np.ones(valid.sum(), dtype=np.int64))
+            # Compact per chunk so memory tracks distinct (leaf, bucket) pairs, not rows
+            self._compact(m)
+        return self
+
+    def _append(self, measure, leaf, bucket, counts):
+        self._entries[measure].append((leaf, bucket, counts))
+        self._compacted.pop(measure, None)
+
+    def _compact(self, measure):
+        """Collapse accumulated entries to one (leaf, bucket) -> count table"""
+        if measure not in self._compacted:
+            parts = self._entries[measure]
+            if not parts:
+                empty = np.array([], dtype=np.int64)
+                self._compacted[measure] = (empty, empty, empty)
+            else:
+                leaf = np.concatenate([p[0] for p in parts])
+                bucket = np.concatenate([p[1] for p in parts])
+                counts = np.concatenate([p[2] for p in parts])
+                span = int(bucket.max()) + 1 if len(bucket) else 1
+                keys, inverse = np.unique(leaf * span + bucket, return_inverse=True)
+                summed = np.bincount(inverse, weights=counts).astype(np.int64)
+                compacted = (keys // span, keys % span, summed)
+                self._entries[measure] = [compacted]
+                self._compacted[measure] = compacted
+        return self._compacted[measure]
+
+    def merge(self, other):
+        """Merge sketches built on another chunk or process"""
+        if self.dims != other.dims or not self.buckets.same_as(other.buckets):
+            raise ValueError("Cannot merge sketches with different dimensions or bucket parameters")
+        remap = self._register(list(other.leaf_keys.itertuples(index=False, name=None)))
+        for m in self.measures:
+            leaf, bucket, counts = other._compact(m)
+            self._append(m, remap[leaf], bucket, counts)
+        return self
+
+    def leaf_mask(self, **filters):
+        """Leaves matching ``dim=value`` or ``dim=[values]`` filters"""
+        mask = np.ones(len(self.leaf_keys), dtype=bool)
+        for dim, selected in filters.items():
+            if selected is None:
+                continue
+            if np.isscalar(selected):
+                selected = [selected]
+            mask &= self.leaf_keys[dim].isin(list(selected)).to_numpy()
+        return mask
+
+    def quantiles(self, measure, qs=(0.5, 0.9, 0.99), **filters):
+        """Quantiles of ``measure`` over every row matching the filters"""
+        leaf, bucket, counts = self._compact(measure)
+        selected = self.leaf_mask(**filters)[leaf]
+        merged = np.bincount(bucket[selected], weights=counts[selected])
+        idx = np.flatnonzero(merged)
+        return _quantiles_from_counts(self.buckets, idx, merged[idx].astype(np.int64), qs)
+
+    def percentile_table(self, measure, by, qs=(0.5, 0.9, 0.99), **filters):
+        """P50/P90/P99-style table with one row per value of ``by`` that has rows matching the filters"""
+        leaf, bucket, counts = self._compact(measure)
+        base = self.leaf_mask(**filters)
+        rows = {}
+        for value in sorted(self.leaf_keys.loc[base, by].unique()):
+            selected = (base & (self.leaf_keys[by] == value).to_numpy())[leaf]
+            merged = np.bincount(bucket[selected], weights=counts[selected])
+            idx = np.flatnonzero(merged)
+            if len(idx) == 0:
+                continue
+            rows[value] = _quantiles_from_counts(self.buckets, idx, merged[idx].astype(np.int64), qs)
+        columns = [f"P{q * 100:g}" for q in qs]
+        return pd.DataFrame.from_dict(rows, orient='index', columns=columns).rename_axis(by)
+
+    def __getstate__(self):
+        for m in self.measures:
+            self._compact(m)
+        return self.__dict__
+
+
+def _key_hashes(keys):
+    """Stable 64-bit hashes of group keys, identical across processes so sketches merge"""
+    labels = np.array(['\x1f'.join(map(str, key)) for key in keys], dtype=object)
+    return pd.util.hash_array(labels)
+
+
+class CountMinSketch:
+    """Count-Min frequency sketch over weighted keys (multiply-shift hashing)"""
+
+    def __init__(self, width=2048, depth=4, seed=7):
+        self.bits = int(np.ceil(np.log2(width)))
+        self.width = 1 << self.bits
+        self.depth = depth
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(1, 2 ** 63, size=depth, dtype=np.uint64) | np.uint64(1)
+        self.table = np.zeros((depth, self.width))
+        self.total = 0.0
+
+    def _cells(self, keys):
+        """(depth, n) column index of every key in every row"""
+        hashes = _key_hashes(keys)
+        return (self.multipliers[:, None] * hashes[None, :]) >> np.uint64(64 - self.bits)
+
+    def update(self, keys, weights):
+        weights = np.asarray(weights, dtype=float)
+        cells = self._cells(keys)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(cells[row], weights=weights, minlength=self.width)
+        self.total += weights.sum()
+        return self
+
+    def estimate(self, keys):
+        """Over-estimated total weight per key"""
+        if not len(keys):
+            return np.array([])
+        cells = self._cells(keys)
+        return self.table[np.arange(self.depth)[:, None], cells].min(axis=0)
+
+    def merge(self, other):
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("Cannot merge Count-Min sketches with different shapes or seeds")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    @property
+    def error_bound(self):
+        """Additive error bound holding with probability ``confidence``"""
+        return np.e / self.width * self.total
+
+    @property
+    def confidence(self):
+        return 1 - np.exp(-self.depth)
+
+
+class SpaceSaving:
+    """Weighted Space-Saving summary: at most ``capacity`` (count, error) counters"""
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.counters = {}
+        self.total = 0.0
+
+    def floor(self):
+        """Upper bound on the weight of any key that is not monitored"""
+        if len(self.counters) < self.capacity:
+            return 0.0
+        return min(count for count, _ in self.counters.values())
+
+    def _combine(self, counters, floor, total):
+        """Mergeable-summaries combine: absent keys count at the other summary's floor"""
+        own_floor = self.floor()
+        merged = {}
+        for key in self.counters.keys() | counters.keys():
+            count_a, error_a = self.counters.get(key, (own_floor, own_floor))
+            count_b, error_b = counters.get(key, (floor, floor))
+            merged[key] = (count_a + count_b, error_a + error_b)
+        ranked = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)
+        self.counters = dict(ranked[:self.capacity])
+        self.total += total
+
+    def update(self, keys, weights):
+        """Add one batch of (key, weight) pairs; the batch itself is summarised exactly"""
+        batch = {}
+        for key, weight in zip(keys, np.asarray(weights, dtype=float).tolist()):
+            batch[key] = (batch.get(key, (0.0, 0.0))[0] + weight, 0.0)
+        self._combine(batch, 0.0, sum(count for count, _ in batch.values()))
+        return self
+
+    def merge(self, other):
+        if self.capacity != other.capacity:
+            raise ValueError("Cannot merge Space-Saving summaries with different capacities")
+        self._combine(other.counters, other.floor(), other.total)
+        return self
+
+    def top(self, k=10):
+        """Top ``k`` keys with over-estimate, guaranteed lower bound and top-K guarantee flag"""
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        counts = np.array([count for _, (count, _) in ranked], dtype=float)
+        errors = np.array([error for _, (_, error) in ranked], dtype=float)
+        # A key is certainly in the top k if its lower bound beats every other key's upper bound
+        threshold = max(counts[k] if len(counts) > k else 0.0, self.floor())
+        top_k = slice(0, k)
+        return pd.DataFrame({
+            'Key': [key for key, _ in ranked[top_k]],
+            'Upper_Bound': counts[top_k],
+            'Lower_Bound': counts[top_k] - errors[top_k],
+            'Guaranteed': (counts[top_k] - errors[top_k]) >= threshold,
+        })
+
+
+HEAVY_HITTER_GROUPINGS = (('Category',), ('City',), ('Category', 'City'))
+
+
+class HeavyHitters:
+    """Streaming top-K rankings of a measure for several groupings, mergeable across workers"""
+
+    def __init__(self, groupings=HEAVY_HITTER_GROUPINGS, measure='Spending_Amount_Thousands_INR',
+                 capacity=64, width=2048, depth=4):
+        self.groupings = [tuple(g) for g in groupings]
+        self.measure = measure
+        self.summaries = {g: SpaceSaving(capacity) for g in self.groupings}
+        self.frequencies = {g: CountMinSketch(width, depth) for g in self.groupings}
+
+    def update(self, chunk):
+        """Add one batch of detailed rows"""
+        for grouping in self.groupings:
+            batch = chunk.groupby(list(grouping), sort=False)[self.measure].sum()
+            keys = [key if isinstance(key, tuple) else (key,) for key in batch.index]
+            weights = batch.to_numpy(dtype=float)
+            self.summaries[grouping].update(keys, weights)
+            self.frequencies[grouping].update(keys, weights)
+        return self
+
+    def merge(self, other):
+        """Merge rankings built on another batch or process"""
+        if self.groupings != other.groupings or self.measure != other.measure:
+            raise ValueError("Cannot merge heavy hitters over different groupings or measures")
+        for grouping in self.groupings:
+            self.summaries[grouping].merge(other.summaries[grouping])
+            self.frequencies[grouping].merge(other.frequencies[grouping])
+        return self
+
+    def top(self, grouping, k=5):
+        """Ranking with estimate and maximum error per key for one grouping"""
+        grouping = (grouping,) if isinstance(grouping, str) else tuple(grouping)
+        ranking = self.summaries[grouping].top(k)
+        # Both sketches over-estimate, so the smaller one is the tighter upper bound
+        count_min = self.frequencies[grouping].estimate(list(ranking['Key']))
+        estimate = np.minimum(ranking['Upper_Bound'].to_numpy(), count_min) if len(ranking) else ranking['Upper_Bound']
+        table = pd.DataFrame(list(ranking['Key']), columns=list(grouping))
+        table.insert(0, 'Rank', np.arange(1, len(ranking) + 1))
+        table['Estimate'] = estimate
+        table['Lower_Bound'] = ranking['Lower_Bound']
+        table['Max_Error'] = table['Estimate'] - table['Lower_Bound']
+        table['Guaranteed'] = ranking['Guaranteed']
+        return table
+
+    def error_bounds(self, grouping):
+        """Global error guarantees of the sketches behind one grouping"""
+        grouping = (grouping,) if isinstance(grouping, str) else tuple(grouping)
+        summary, frequencies = self.summaries[grouping], self.frequencies[grouping]
+        return {
+            'total': summary.total,
+            'space_saving': summary.total / summary.capacity,
+            'count_min': frequencies.error_bound,
+            'count_min_confidence': frequencies.confidence,
+        }
+
+
+def build_heavy_hitters(source, chunksize=100_000, **kwargs):
+    """Build heavy-hitter rankings in one streaming pass over a CSV path or a DataFrame"""
+    heavy_hitters = HeavyHitters(**kwargs)
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            heavy_hitters.update(source.iloc[start:start + chunksize])
+    else:
+        for chunk in pd.read_csv(source, chunksize=chunksize):
+            heavy_hitters.update(chunk)
+    return heavy_hitters
+
+
+def load_heavy_hitters(source_path, **kwargs):
+    """Persisted heavy-hitter rankings for the detailed dataset"""
+    return cached_result(
+        result_key('heavy_hitters', tuple(sorted(kwargs.items()))),
+        [source_path],
+        lambda: build_heavy_hitters(source_path, **kwargs)
+    )
+
+
+def build_slice_sketches(source, chunksize=100_000, **kwargs):
+    """Build sketches in one streaming pass over a CSV path or a DataFrame"""
+    sketches = SliceSketches(**kwargs)
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            sketches.update(source.iloc[start:start + chunksize])
+    else:
+        for chunk in pd.read_csv(source, chunksize=chunksize):
+            sketches.update(chunk)
+    return sketches
+
+
+def load_slice_sketches(source_path, **kwargs):
+    """Persisted slice sketches for the detailed dataset"""
+    return cached_result(
+        result_key('slice_sketches', tuple(sorted(kwargs.items()))),
+        [source_path],
+        lambda: build_slice_sketches(source_path, **kwargs)
+    )
@@ -0,0 +1,158 @@
+"""
+Credit Card Spending Analysis - Result Store
+============================================
+
+Persists expensive derived results (decompositions, rollups, sketches, parsed
+datasets, dashboard aggregates) under a local cache directory so they can be
+looked up instantly on the next run. Entries are tagged with the size,
+modification time and content hash of the source files they were computed
+from. A source that is rewritten with identical content (e.g. by a redeploy)
+keeps its entries valid; any content change invalidates them.
+"""
+
+import hashlib
+import importlib.util
+import os
+import pickle
+
+import pandas as pd
+
+CACHE_DIR = '.analysis_cache'
+
+# Data frames are stored as Feather files when pyarrow is installed, pickles otherwise
+FEATHER_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+_digests = {}
+
+
+def source_signature(sources):
+    """(path, size, mtime) tuple for each source file"""
+    signature = []
+    for path in sources:
+        stat = os.stat(path)
+        signature.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def file_digest(path):
+    """MD5 of a file's contents, memoized per (path, size, mtime)"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _digests:
+        md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                md5.update(block)
+        _digests[key] = md5.hexdigest()
+    return _digests[key]
+
+
+def content_signature(sources):
+    """(path, size, content hash) tuple for each source file"""
+    return tuple((os.path.abspath(path), os.stat(path).st_size, file_digest(path)) for path in sources)
+
+
+def dataset_version(sources):
+    """Short version tag that changes whenever the content of any source file changes"""
+    return result_key('data', content_signature(sources))
+
+
+def result_key(name, *params):
+    """Stable cache key for a result computed with the given parameters"""
+    if not params:
+        return name
+    digest = hashlib.md5(repr(params).encode('utf-8')).hexdigest()[:12]
+    return f"{name}_{digest}"
+
+
+def _entry_path(name, cache_dir):
+    return os.path.join(cache_dir, f"{name}.pkl")
+
+
+def save_result(name, payload, sources=(), cache_dir=CACHE_DIR):
+    """Persist a result together with the signature of its sources"""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = {
+        'signature': source_signature(sources),
+        'content': content_signature(sources),
+        'payload': payload
+    }
+    tmp_path = _entry_path(name, cache_dir) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, _entry_path(name, cache_dir))
+
+
+def load_result(name, sources=(), cache_dir=CACHE_DIR):
+    """Load a persisted result, or None if it is missing or stale"""
+    path = _entry_path(name, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if entry.get('signature') != source_signature(sources):
+        # Touched but unchanged sources keep the entry; refresh its signature
+        if entry.get('content') != content_signature(sources):
+            return None
+        save_result(name, entry['payload'], sources, cache_dir)
+    return entry['payload']
+
+
+def touch_result(name, cache_dir=CACHE_DIR):
+    """Mark a persisted result as just used; ``prune_results`` evicts by last use"""
+    try:
+        os.utime(_entry_path(name, cache_dir))
+    except FileNotFoundError:
+        pass
+
+
+def prune_results(prefix, max_bytes, cache_dir=CACHE_DIR):
+    """Delete the least recently used ``prefix`` results until they fit in ``max_bytes``; returns bytes freed"""
+    entries = []
+    try:
+        with os.scandir(cache_dir) as listing:
+            for entry in listing:
+                if entry.name.startswith(f"{prefix}_") and entry.name.endswith('.pkl'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        freed += size
+    return freed
+
+
+def cached_result(name, sources, compute, cache_dir=CACHE_DIR):
+    """Return the persisted result for ``name``, computing and saving it if needed"""
+    payload = load_result(name, sources, cache_dir)
+    if payload is None:
+        payload = compute()
+        save_result(name, payload, sources, cache_dir)
+    return payload
+
+
+def cached_frame(name, sources, compute, cache_dir=CACHE_DIR):
+    """``cached_result`` for a DataFrame with a default index, stored as Feather when possible"""
+    if not FEATHER_AVAILABLE:
+        return cached_result(name, sources, compute, cache_dir)
+    data_path = os.path.join(cache_dir, f"{name}.feather")
+    # The pickled entry only records the sources' signature; the frame lives in the Feather file
+    if load_result(name, sources, cache_dir) == data_path and os.path.exists(data_path):
+        return pd.read_feather(data_path)
+    df = compute()
+    os.makedirs(cache_dir, exist_ok=True)
+    df.to_feather(data_path + '.tmp')
+    os.replace(data_path + '.tmp', data_path)
+    save_result(name, data_path, sources, cache_dir)
+    return df
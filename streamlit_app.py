@@ -1,16 +1,35 @@
 
+import time
+import uuid
+render_started = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import seaborn as sns
-import matplotlib.pyplot as plt 
-from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from box_stats import box_figure, box_summary
+from cube import slice_labels
+from dashboard_cache import AggregateCache, filter_state_key
+from export import EXPORT_FORMATS, available_formats, export_bytes
+from figure_cache import FigureCache
+from geography import GeoDimension
+from hierarchy import SPENDING, TRANSACTIONS, load_hierarchy
+from decomposition import load_decomposition
+from downsample import DEFAULT_MAX_POINTS, METHODS, downsample, use_webgl
+from indexes import BitmapIndex, DateRangeIndex, load_prefix_sum_index
+from pivot import NORMALIZE, PIVOT_STATS, PivotEngine
+from sampling import StratifiedSample, choose_mode
+from shared_data import load_dataset, shared_view
+from sketches import load_heavy_hitters, load_slice_sketches
+from store import dataset_version
+from time_pyramid import LEVELS, MAIN_MEASURES, TimePyramid
+from window_metrics import lagged_growth, load_window_metrics, year_to_date
+
 # Page configuration
 st.set_page_config(
     page_title="Credit Card Spending Analysis Dashboard",
@@ -46,29 +65,134 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load data
-@st.cache_data
-def load_data():
-    try:
-        main_df = pd.read_csv('card_spending_trends.csv')
-        main_df['Date'] = pd.to_datetime(main_df['Date'])
+# Tabs that read the 213K-row detailed dataset; the others only need the main dataset
+DETAILED_TABS = ["Category Analysis", "Geographic Analysis", "Demographic Analysis", "Period Comparison",
+                 "Drill-down Explorer", "Pivot Explorer", "Advanced Analytics"]
+
+# Source files each kind of tab reads; its cache versions and persisted aggregates depend on these only
+MAIN_SOURCES = ('card_spending_trends.csv',)
+DETAILED_SOURCES = MAIN_SOURCES + ('detailed_card_spending.csv',)
 
-        detailed_df = pd.read_csv('detailed_card_spending.csv') 
-        detailed_df['Date'] = pd.to_datetime(detailed_df['Date'])
+# Load data (each dataset is parsed the first time a view needs it, then shared)
+@st.cache_resource
+def get_shared_dataset(path):
+    """Date-sorted dataset loaded once per server process (persisted across restarts) and shared by every session"""
+    return load_dataset(path)
 
-        return main_df, detailed_df
+def load_main_data():
+    try:
+        return shared_view(get_shared_dataset('card_spending_trends.csv'))
     except FileNotFoundError:
-        st.error("Data files not found. Please ensure card_spending_trends.csv and detailed_card_spending.csv are in the same directory.")
-        return None, None
+        st.error("Data file not found. Please ensure card_spending_trends.csv is in the same directory.")
+        return None
+
+def load_detailed_data():
+    try:
+        return shared_view(get_shared_dataset('detailed_card_spending.csv'))
+    except FileNotFoundError:
+        st.error("Data file not found. Please ensure detailed_card_spending.csv is in the same directory.")
+        return None
+
+@st.cache_data
+def get_columns(path):
+    """Column names of a CSV, read from its header only"""
+    return list(pd.read_csv(path, nrows=0).columns)
+
+@st.cache_resource
+def get_decomposition(_detailed_df):
+    """Seasonal decomposition of every segment series, persisted across restarts"""
+    return load_decomposition(_detailed_df, 'detailed_card_spending.csv')
+
+@st.cache_resource
+def get_window_metrics(_detailed_df):
+    """Growth, rolling and YTD metrics for every slice, persisted across restarts"""
+    return load_window_metrics(_detailed_df, 'detailed_card_spending.csv')
+
+@st.cache_resource
+def get_date_index(name, _df):
+    """Date-range index over one dataset, built once per process"""
+    return DateRangeIndex(_df)
+
+@st.cache_resource
+def get_main_pyramid(_main_df):
+    """Month, quarter, financial-year and calendar-year aggregates of the main dataset, built once per process"""
+    return TimePyramid.from_frame(_main_df)
+
+@st.cache_resource
+def get_geography():
+    """City -> State / Region / Tier dimension table with integer-coded levels"""
+    return GeoDimension.from_csv('city_dimension.csv')
+
+@st.cache_resource
+def get_bitmap_index(_detailed_df):
+    """Per-value bitmaps for the dimension filters, built once per process"""
+    return BitmapIndex(_detailed_df, ['Category', 'City', 'Age_Group', 'Gender', 'Card_Type'])
+
+@st.cache_resource
+def get_prefix_sums(_detailed_df):
+    """Prefix sums over every leaf segment for O(1) date-range totals, persisted across restarts"""
+    return load_prefix_sum_index(_detailed_df, 'detailed_card_spending.csv')
+
+@st.cache_resource
+def get_pivot_engine(_detailed_df):
+    """Cross-tabs of any two or three dimensions over the leaf-slice prefix sums, built once per process"""
+    return PivotEngine(get_prefix_sums(_detailed_df), get_geography())
+
+@st.cache_resource
+def get_hierarchy(_detailed_df):
+    """City -> Category -> Age_Group -> Card_Type aggregates for the drill-down explorer, persisted across restarts"""
+    return load_hierarchy(_detailed_df, 'detailed_card_spending.csv')
+
+@st.cache_resource
+def get_slice_sketches():
+    """Mergeable quantile sketches per leaf slice, persisted across restarts"""
+    return load_slice_sketches('detailed_card_spending.csv')
+
+@st.cache_resource
+def get_heavy_hitters():
+    """Streaming top-K sketches for Category, City and their pairs, persisted across restarts"""
+    return load_heavy_hitters('detailed_card_spending.csv')
+
+@st.cache_resource
+def get_stratified_sample(_detailed_df):
+    """Category x City x Date stratified sample for approximate answers, built once per process"""
+    return StratifiedSample(_detailed_df, fraction=0.1)
+
+@st.cache_resource
+def get_aggregate_cache(sources):
+    """Derived aggregates of the tabs reading ``sources``, shared by all sessions, LRU-bounded in memory and persisted to disk"""
+    return AggregateCache(max_bytes=256 * 1024 * 1024, sources=list(sources))
+
+@st.cache_resource
+def get_figure_cache():
+    """Serialized Plotly figures shared by all sessions, bounded in memory with LRU eviction"""
+    return FigureCache(max_bytes=64 * 1024 * 1024)
+
+@st.cache_resource
+def get_background_jobs():
+    """Worker processes for model fits, publishing into the shared aggregate cache"""
+    from jobs import BackgroundJobs  # sklearn is only imported once a model view is opened
+    return BackgroundJobs(get_aggregate_cache(DETAILED_SOURCES), max_workers=2)
+
+@st.fragment(run_every=1.0)
+def job_progress(key, label):
+    """Progress placeholder for a background job; reruns the app once the job has finished"""
+    status = get_background_jobs().status(key)
+    if status['state'] not in ('queued', 'running'):
+        st.rerun()
+    st.progress(
+        min(status['elapsed'] / status['timeout'], 1.0),
+        text=f"⏳ {label}: {status['state']} for {status['elapsed']:.0f}s (timeout {status['timeout']}s)"
+    )
 
 # Main title and description
 st.title("💳 Credit Card Spending Analysis Dashboard")
 st.markdown("### Interactive Analysis of Credit Card Spending Trends in India (2019-2025)")
 
 # Load data
-main_df, detailed_df = load_data()
+main_df = load_main_data()
 
-if main_df is not None and detailed_df is not None:
+if main_df is not None:
     # Sidebar filters
     st.sidebar.header("📊 Dashboard Controls")
 
@@ -83,27 +207,105 @@ if main_df is not None and detailed_df is not None:
         max_value=max_date
     )
 
-    # Filter main data
-    if len(date_range) == 2:
-        filtered_main = main_df[
-            (main_df['Date'].dt.date >= date_range[0]) & 
-            (main_df['Date'].dt.date <= date_range[1])
-        ]
-        filtered_detailed = detailed_df[
-            (detailed_df['Date'].dt.date >= date_range[0]) & 
-            (detailed_df['Date'].dt.date <= date_range[1])
-        ]
-    else:
-        filtered_main = main_df
-        filtered_detailed = detailed_df
-
     # Analysis type selector
     analysis_type = st.sidebar.selectbox(
         "Select Analysis Type:",
-        ["Overview", "Time Series Analysis", "Category Analysis", "Geographic Analysis", "Demographic Analysis"]
+        ["Overview", "Time Series Analysis"] + DETAILED_TABS
     )
 
-    if analysis_type == "Overview":
+    # Filter main data (binary search on the sorted dates, no row scan)
+    selected_range = tuple(date_range) if len(date_range) == 2 else (None, None)
+    filtered_main = get_date_index('main', main_df).slice(*selected_range)
+
+    # The detailed dataset, its indexes and the segment controls only load for tabs that use them
+    detailed_df = filtered_detailed = None
+    segment_filters = {}
+    execution_mode = 'exact'
+    if analysis_type in DETAILED_TABS:
+        detailed_df = load_detailed_data()
+        if detailed_df is None:
+            st.stop()
+
+        # Segment filters, answered from bitmap indexes
+        bitmap_index = get_bitmap_index(detailed_df)
+        with st.sidebar.expander("🔎 Segment Filters"):
+            for dim, label in [('City', "Cities"), ('Age_Group', "Age Groups"), ('Gender', "Genders"), ('Card_Type', "Card Types")]:
+                options = bitmap_index.values(dim)
+                segment_filters[dim] = st.multiselect(f"Select {label}:", options, default=options)
+
+        date_bounds = get_date_index('detailed', detailed_df).bounds(*selected_range)
+        filtered_detailed = bitmap_index.filter(detailed_df, segment_filters, *date_bounds)
+
+        # Exact or sample-based answers; 'Auto' stays exact while the rows in range are cheap to scan
+        requested_mode = st.sidebar.radio(
+            "⚡ Execution Mode:",
+            ["Auto", "Exact", "Approximate"],
+            horizontal=True,
+            help="Approximate mode answers totals, averages and shares from a stratified sample with 95% confidence intervals"
+        )
+        execution_mode = choose_mode(requested_mode.lower(), date_bounds[1] - date_bounds[0])
+
+    # Long series are downsampled server-side to about one point per pixel; narrowing the
+    # date range re-samples the smaller window from the full-resolution data
+    with st.sidebar.expander("🖥️ Chart Rendering"):
+        full_resolution = st.checkbox("Full resolution", help="Send every point to the browser (slow for long daily series)")
+        max_points = None if full_resolution else st.slider(
+            "Points per line (≈ chart width in pixels):", 200, 4000, DEFAULT_MAX_POINTS, step=100)
+        downsample_method = st.radio(
+            "Downsampling:", METHODS, format_func={'lttb': "LTTB", 'minmax': "Min/Max"}.get, horizontal=True)
+
+    def plot_points(frame, x, y):
+        """Rows of a chart series, downsampled to the point budget unless full resolution is on"""
+        return downsample(frame, x, y, max_points, downsample_method)
+
+    # Derived aggregates are cached per (tab, date range, filters, dataset version); the version
+    # only covers the files the tab reads, so main-dataset tabs never touch the detailed CSV
+    view_sources = DETAILED_SOURCES if analysis_type in DETAILED_TABS else MAIN_SOURCES
+    aggregate_cache = get_aggregate_cache(view_sources)
+    data_version = dataset_version(view_sources)
+    filter_key = (tuple(str(d) for d in date_range), filter_state_key(segment_filters), data_version)
+
+    def cached_aggregate(name, compute, *extra_key):
+        return aggregate_cache.get_or_compute((analysis_type, name) + filter_key + extra_key, compute)
+
+    def cached_figure(chart_id, data, build, **params):
+        """Figure for a chart, rebuilt only when its input data or layout parameters change"""
+        return get_figure_cache().figure(chart_id, data, build, **params)
+
+    approximate = execution_mode == 'approximate'
+
+    def spending_by(name, by, filters, *extra_key):
+        """Spending sum, mean and share per group, estimated from the sample in approximate mode
+
+        State, Region and Tier are rolled up from City through the geography dimension table.
+        """
+        rollup = by in get_geography().levels[1:]
+        if approximate:
+            def compute():
+                sample = get_stratified_sample(detailed_df)
+                groups = get_geography().codes(sample.sample['City'], by) if rollup else None
+                return sample.estimate_groups('Spending_Amount_Thousands_INR', by, filters, *selected_range, groups=groups)
+        else:
+            # Exact totals are prefix-sum differences per leaf segment, not a scan of the filtered rows
+            def compute():
+                grouped = get_prefix_sums(detailed_df).group_stats(
+                    'Spending_Amount_Thousands_INR', 'City' if rollup else by, *selected_range, filters=filters)
+                return get_geography().rollup(grouped, by) if rollup else grouped
+        return cached_aggregate(name, compute, execution_mode, *extra_key)
+
+    def approximate_caption():
+        if approximate:
+            st.caption(f"⚡ Approximate: estimated from a {len(get_stratified_sample(detailed_df)):,}-row "
+                       "stratified sample (Category x City x Date); error bars are 95% confidence intervals")
+
+    # Tabs that chart the filtered rows have nothing to draw for an empty segment selection
+    segment_empty = analysis_type in ("Category Analysis", "Geographic Analysis", "Demographic Analysis") and (
+        not all(segment_filters.values()) or filtered_detailed.empty)
+    if segment_empty:
+        st.info("No records match the selected segment filters and date range. "
+                "Select at least one value for every segment filter.")
+
+    elif analysis_type == "Overview":
         # Key metrics row
         st.header("📈 Key Performance Indicators")
 
@@ -147,48 +349,60 @@ if main_df is not None and detailed_df is not None:
         # Main trend chart
         st.header("📊 Spending and Cards Growth Trend")
 
-        fig = make_subplots(
-            specs=[[{"secondary_y": True}]],
-            subplot_titles=["Credit Card Spending & Active Cards Growth"]
-        )
+        spending_points = plot_points(filtered_main, 'Date', 'Total_Spending_Billion_INR')
+        cards_points = plot_points(filtered_main, 'Date', 'Active_Cards_Millions')
+        webgl = use_webgl(len(spending_points) + len(cards_points))
+        trace, trace_mode = (go.Scattergl, 'lines') if webgl else (go.Scatter, 'lines+markers')
 
-        # Add spending trend
-        fig.add_trace(
-            go.Scatter(
-                x=filtered_main['Date'],
-                y=filtered_main['Total_Spending_Billion_INR'],
-                mode='lines+markers',
-                name='Total Spending (Billion INR)',
-                line=dict(color='#1f77b4', width=3),
-                hovertemplate='<b>%{x}</b><br>Spending: ₹%{y:.1f}B<extra></extra>'
-            ),
-            secondary_y=False,
-        )
+        def build_trend_figure():
+            fig = make_subplots(
+                specs=[[{"secondary_y": True}]],
+                subplot_titles=["Credit Card Spending & Active Cards Growth"]
+            )
 
-        # Add cards trend on secondary y-axis
-        fig.add_trace(
-            go.Scatter(
-                x=filtered_main['Date'],
-                y=filtered_main['Active_Cards_Millions'],
-                mode='lines+markers',
-                name='Active Cards (Millions)',
-                line=dict(color='#ff7f0e', width=3),
-                hovertemplate='<b>%{x}</b><br>Cards: %{y:.1f}M<extra></extra>'
-            ),
-            secondary_y=True,
-        )
+            # Add spending trend
+            fig.add_trace(
+                trace(
+                    x=spending_points['Date'],
+                    y=spending_points['Total_Spending_Billion_INR'],
+                    mode=trace_mode,
+                    name='Total Spending (Billion INR)',
+                    line=dict(color='#1f77b4', width=3),
+                    hovertemplate='<b>%{x}</b><br>Spending: ₹%{y:.1f}B<extra></extra>'
+                ),
+                secondary_y=False,
+            )
 
-        # Update layout
-        fig.update_xaxes(title_text="Date")
-        fig.update_yaxes(title_text="Total Spending (Billion INR)", secondary_y=False)
-        fig.update_yaxes(title_text="Active Cards (Millions)", secondary_y=True)
-        fig.update_layout(
-            title="Credit Card Market Growth Trajectory",
-            hovermode='x unified',
-            height=500,
-            showlegend=True
-        )
+            # Add cards trend on secondary y-axis
+            fig.add_trace(
+                trace(
+                    x=cards_points['Date'],
+                    y=cards_points['Active_Cards_Millions'],
+                    mode=trace_mode,
+                    name='Active Cards (Millions)',
+                    line=dict(color='#ff7f0e', width=3),
+                    hovertemplate='<b>%{x}</b><br>Cards: %{y:.1f}M<extra></extra>'
+                ),
+                secondary_y=True,
+            )
 
+            # Update layout
+            fig.update_xaxes(title_text="Date")
+            fig.update_yaxes(title_text="Total Spending (Billion INR)", secondary_y=False)
+            fig.update_yaxes(title_text="Active Cards (Millions)", secondary_y=True)
+            fig.update_layout(
+                title="Credit Card Market Growth Trajectory",
+                hovermode='x unified',
+                height=500,
+                showlegend=True
+            )
+            return fig
+
+        fig = cached_figure(
+            'market_growth',
+            (spending_points[['Date', 'Total_Spending_Billion_INR']], cards_points[['Date', 'Active_Cards_Millions']]),
+            build_trend_figure
+        )
         st.plotly_chart(fig, use_container_width=True)
 
         # Summary insights
@@ -220,18 +434,53 @@ if main_df is not None and detailed_df is not None:
             ["Total_Spending_Billion_INR", "Active_Cards_Millions", "Avg_Monthly_Spend_INR", "YoY_Growth_Spending"]
         )
 
-        # Create time series plot
-        fig = px.line(
-            filtered_main, 
-            x='Date', 
-            y=metric_choice,
-            title=f"{metric_choice.replace('_', ' ').title()} Over Time",
-            markers=True
-        )
+        # Coarser resolutions are read from the time pyramid; 'Auto' picks the coarsest
+        # level whose periods exactly tile the selected range
+        granularity = st.radio(
+            "Granularity:", ["Auto"] + LEVELS, format_func=lambda level: level.replace('_', ' '), horizontal=True)
+        time_pyramid = get_main_pyramid(main_df)
+        if filtered_main.empty:
+            # No month-end date in the range: nothing to aggregate, the monthly view stays empty
+            st.info("No monthly data points fall inside the selected date range.")
+            time_level = 'Month'
+        else:
+            range_start, range_end = filtered_main['Date'].iloc[[0, -1]]
+            time_level = time_pyramid.choose_level(range_start, range_end, min_periods=8) if granularity == "Auto" else granularity
+
+        def compute_metric_by_period():
+            if metric_choice in MAIN_MEASURES:
+                return time_pyramid.frame(time_level, [metric_choice], range_start, range_end)
+            # Growth is recomputed against the same period a year earlier, not averaged
+            periods = time_pyramid.frame(time_level, ['Total_Spending_Billion_INR'], range_start, range_end)
+            periods[metric_choice] = time_pyramid.growth('Total_Spending_Billion_INR', time_level, range_start, range_end)
+            return periods[['Period', 'Date', 'Months', metric_choice]]
+
+        if time_level == 'Month':
+            metric_series = filtered_main[['Date', metric_choice]]
+        else:
+            metric_series = cached_aggregate('metric_by_period', compute_metric_by_period, metric_choice, time_level)
+            st.caption(f"📐 {time_level.replace('_', ' ')} values from the precomputed time pyramid"
+                       + (" (financial years run April-March)" if time_level == 'Financial_Year' else ""))
 
-        fig.update_layout(
-            height=500,
-            hovermode='x unified'
+        # Create time series plot
+        metric_points = plot_points(metric_series, 'Date', metric_choice)
+        webgl = use_webgl(len(metric_points))
+        fig = cached_figure(
+            'metric_trend',
+            metric_points,
+            lambda: px.line(
+                metric_points, 
+                x='Date', 
+                y=metric_choice,
+                hover_data=['Period'] if 'Period' in metric_points else None,
+                title=f"{metric_choice.replace('_', ' ').title()} Over Time ({time_level.replace('_', ' ')})",
+                markers=not webgl,
+                render_mode='webgl' if webgl else 'svg'
+            ).update_layout(
+                height=500,
+                hovermode='x unified'
+            ),
+            level=time_level
         )
 
         st.plotly_chart(fig, use_container_width=True)
@@ -241,156 +490,717 @@ if main_df is not None and detailed_df is not None:
             st.subheader("📅 Seasonal Analysis")
 
             # Create month-wise analysis
-            monthly_avg = filtered_main.groupby(filtered_main['Date'].dt.month)[metric_choice].mean().reset_index()
-            monthly_avg['Month_Name'] = monthly_avg['Date'].apply(lambda x: pd.Timestamp(2024, x, 1).strftime('%B'))
+            def compute_monthly_avg():
+                monthly_avg = filtered_main.groupby(filtered_main['Date'].dt.month)[metric_choice].mean().reset_index()
+                monthly_avg['Month_Name'] = monthly_avg['Date'].apply(lambda x: pd.Timestamp(2024, x, 1).strftime('%B'))
+                return monthly_avg
+
+            monthly_avg = cached_aggregate('monthly_avg', compute_monthly_avg, metric_choice)
 
-            fig2 = px.bar(
+            fig2 = cached_figure(
+                'monthly_avg',
                 monthly_avg,
-                x='Month_Name',
-                y=metric_choice,
-                title=f"Average {metric_choice.replace('_', ' ').title()} by Month"
+                lambda: px.bar(
+                    monthly_avg,
+                    x='Month_Name',
+                    y=metric_choice,
+                    title=f"Average {metric_choice.replace('_', ' ').title()} by Month"
+                )
             )
 
             st.plotly_chart(fig2, use_container_width=True)
 
+            # Seasonal index of any segment from the precomputed decomposition (needs the detailed dataset)
+            if st.checkbox("Show seasonal index by segment"):
+                decomposition = get_decomposition(load_detailed_data())
+                seasonal_table = decomposition.seasonal_table()
+                seasonal_table['Segment'] = seasonal_table['Level'] + ': ' + slice_labels(seasonal_table, decomposition.dims)
+                segment_choice = st.selectbox("Select Segment for Seasonal Index:", seasonal_table['Segment'])
+                segment_row = seasonal_table[seasonal_table['Segment'] == segment_choice].iloc[0]
+
+                seasonal_index = pd.DataFrame({
+                    'Month_Name': [pd.Timestamp(2024, m, 1).strftime('%B') for m in range(1, 13)],
+                    'Seasonal_Index': [segment_row[m] for m in range(1, 13)]
+                })
+
+                fig3 = cached_figure(
+                    'seasonal_index',
+                    seasonal_index,
+                    lambda: px.bar(
+                        seasonal_index,
+                        x='Month_Name',
+                        y='Seasonal_Index',
+                        title=f"Seasonal Index for {segment_choice} (1.0 = average month)"
+                    ),
+                    segment=segment_choice
+                )
+
+                st.plotly_chart(fig3, use_container_width=True)
+
     elif analysis_type == "Category Analysis":
         st.header("🛍️ Category-wise Spending Analysis")
 
         # Category filters
+        category_options = bitmap_index.values('Category')
         categories = st.multiselect(
             "Select Categories:",
-            filtered_detailed['Category'].unique(),
-            default=filtered_detailed['Category'].unique()[:6]
+            category_options,
+            default=category_options[:6]
         )
 
         if categories:
-            category_data = filtered_detailed[filtered_detailed['Category'].isin(categories)]
+            category_key = tuple(sorted(categories))
 
-            # Category spending over time
-            category_trends = category_data.groupby(['Date', 'Category'])['Spending_Amount_Thousands_INR'].sum().reset_index()
+            def category_data():
+                return bitmap_index.filter(detailed_df, {**segment_filters, 'Category': categories}, *date_bounds)
 
-            fig = px.area(
-                category_trends,
-                x='Date',
-                y='Spending_Amount_Thousands_INR',
-                color='Category',
-                title="Category-wise Spending Trends"
+            # Category spending over time
+            category_trends = cached_aggregate(
+                'category_trends',
+                lambda: category_data().groupby(['Date', 'Category'])['Spending_Amount_Thousands_INR'].sum().reset_index(),
+                category_key
             )
 
-            fig.update_layout(height=500)
+            # Stacked areas need SVG traces, so long ranges are only downsampled
+            category_points = plot_points(category_trends, 'Date', 'Spending_Amount_Thousands_INR')
+            fig = cached_figure(
+                'category_trends',
+                category_points,
+                lambda: px.area(
+                    category_points,
+                    x='Date',
+                    y='Spending_Amount_Thousands_INR',
+                    color='Category',
+                    title="Category-wise Spending Trends"
+                ).update_layout(height=500)
+            )
             st.plotly_chart(fig, use_container_width=True)
 
             # Category distribution
             col1, col2 = st.columns(2)
 
             with col1:
-                total_by_category = category_data.groupby('Category')['Spending_Amount_Thousands_INR'].sum().sort_values(ascending=True)
-
-                fig2 = px.bar(
-                    x=total_by_category.values,
-                    y=total_by_category.index,
-                    orientation='h',
-                    title="Total Spending by Category"
+                total_by_category = spending_by(
+                    'total_by_category',
+                    'Category',
+                    {**segment_filters, 'Category': categories},
+                    category_key
+                ).sort_values('sum', ascending=True)
+
+                fig2 = cached_figure(
+                    'total_by_category',
+                    total_by_category[['sum', 'sum_ci']],
+                    lambda: px.bar(
+                        x=total_by_category['sum'],
+                        y=total_by_category.index,
+                        error_x=total_by_category['sum_ci'] if approximate else None,
+                        orientation='h',
+                        title="Total Spending by Category"
+                    ),
+                    approximate=approximate
                 )
                 st.plotly_chart(fig2, use_container_width=True)
 
             with col2:
-                fig3 = px.pie(
-                    values=total_by_category.values,
-                    names=total_by_category.index,
-                    title="Category Distribution"
+                fig3 = cached_figure(
+                    'category_distribution',
+                    total_by_category['sum'],
+                    lambda: px.pie(
+                        values=total_by_category['sum'],
+                        names=total_by_category.index,
+                        title="Category Distribution"
+                    )
                 )
                 st.plotly_chart(fig3, use_container_width=True)
 
+            approximate_caption()
+
+            # Growth metrics at the end of the selected range
+            window_metrics = get_window_metrics(detailed_df)
+            snapshot_date = category_trends['Date'].max()
+            st.subheader(f"📐 Growth Metrics ({snapshot_date.strftime('%B %Y')})")
+            snapshot = window_metrics.snapshot('Spending_Amount_Thousands_INR', date=snapshot_date, level='Category')
+            snapshot = snapshot[snapshot['Category'].isin(categories)]
+            st.dataframe(
+                snapshot[['Category', 'MoM_Growth', 'YoY_Growth', 'Rolling_Mean_3', 'Rolling_Mean_12', 'YTD']]
+                .set_index('Category').round(1),
+                use_container_width=True
+            )
+
     elif analysis_type == "Geographic Analysis":
         st.header("🌍 Geographic Spending Analysis")
 
-        # City analysis
-        city_data = filtered_detailed.groupby(['City', 'Date'])['Spending_Amount_Thousands_INR'].sum().reset_index()
+        # Any level of the geography dimension table; coarser levels roll up from City
+        geography = get_geography()
+        geo_level = st.radio("Geography level:", geography.levels, horizontal=True)
+        level_label = "City" if geo_level == 'City' else geo_level
+        data_cities = bitmap_index.values('City')
 
-        # Top cities
-        top_cities = filtered_detailed.groupby('City')['Spending_Amount_Thousands_INR'].sum().sort_values(ascending=False)
+        # Top cities (or states, regions, tiers)
+        top_cities = spending_by('top_cities', geo_level, segment_filters, geo_level).sort_values('sum', ascending=False)
 
         col1, col2 = st.columns(2)
 
         with col1:
-            fig = px.bar(
-                x=top_cities.values,
-                y=top_cities.index,
-                orientation='h',
-                title="Total Spending by City"
+            fig = cached_figure(
+                'top_cities',
+                top_cities[['sum', 'sum_ci']],
+                lambda: px.bar(
+                    x=top_cities['sum'],
+                    y=top_cities.index,
+                    error_x=top_cities['sum_ci'] if approximate else None,
+                    orientation='h',
+                    title=f"Total Spending by {level_label}"
+                ),
+                approximate=approximate
             )
             st.plotly_chart(fig, use_container_width=True)
+            approximate_caption()
 
         with col2:
-            # City trends over time
-            city_choice = st.selectbox("Select City for Trend Analysis:", top_cities.index[:5])
-            city_trend = city_data[city_data['City'] == city_choice]
+            # Trend of the chosen member (only its cities' rows are scanned)
+            city_choice = st.selectbox(f"Select {level_label} for Trend Analysis:", top_cities.index[:5])
+            member_cities = [city for city in geography.members(geo_level, city_choice, data_cities)
+                             if city in segment_filters['City']]
+            city_trend = cached_aggregate(
+                'city_trend',
+                lambda: bitmap_index.filter(detailed_df, {**segment_filters, 'City': member_cities}, *date_bounds)
+                .groupby('Date')['Spending_Amount_Thousands_INR'].sum().reset_index(),
+                geo_level, city_choice
+            )
 
-            fig2 = px.line(
-                city_trend,
-                x='Date',
-                y='Spending_Amount_Thousands_INR',
-                title=f"Spending Trend for {city_choice}",
-                markers=True
+            city_points = plot_points(city_trend, 'Date', 'Spending_Amount_Thousands_INR')
+            webgl = use_webgl(len(city_points))
+            fig2 = cached_figure(
+                'city_trend',
+                city_points,
+                lambda: px.line(
+                    city_points,
+                    x='Date',
+                    y='Spending_Amount_Thousands_INR',
+                    title=f"Spending Trend for {city_choice}",
+                    markers=not webgl,
+                    render_mode='webgl' if webgl else 'svg'
+                ),
+                level=geo_level,
+                city=city_choice
             )
             st.plotly_chart(fig2, use_container_width=True)
 
+            window_metrics = get_window_metrics(detailed_df)
+            if geo_level == 'City':
+                city_metrics = window_metrics.slice_frame('Spending_Amount_Thousands_INR', City=city_choice)
+            else:
+                # Member cities' monthly values add up; growth and YTD are recomputed on the sum
+                values = sum(
+                    window_metrics.slice_frame('Spending_Amount_Thousands_INR', City=city)['Value'].to_numpy()
+                    for city in geography.members(geo_level, city_choice, data_cities)
+                )[np.newaxis, :]
+                city_metrics = pd.DataFrame({
+                    'MoM_Growth': lagged_growth(values, 1)[0],
+                    'YoY_Growth': lagged_growth(values, 12)[0],
+                    'YTD': year_to_date(values, window_metrics.periods)[0],
+                }, index=window_metrics.periods)
+            latest_city = city_metrics.loc[:city_trend['Date'].max()].iloc[-1]
+            metric_col1, metric_col2, metric_col3 = st.columns(3)
+            metric_col1.metric("MoM Growth", f"{latest_city['MoM_Growth']:.1f}%")
+            metric_col2.metric("YoY Growth", f"{latest_city['YoY_Growth']:.1f}%")
+            metric_col3.metric("YTD Spending", f"₹{latest_city['YTD']/1000:.1f}M")
+
+        with st.expander("🗺️ City Dimension Table"):
+            st.dataframe(geography.table[geography.table['City'].isin(data_cities)].set_index('City'),
+                         use_container_width=True)
+
+        # Streaming top-K over the whole feed, maintained without retaining every group
+        st.subheader("🔥 Heavy Hitters (Streaming Top-K)")
+        heavy_hitters = get_heavy_hitters()
+        grouping_labels = {' x '.join(g): g for g in heavy_hitters.groupings}
+        grouping_choice = st.radio("Rank by:", list(grouping_labels), horizontal=True)
+        grouping = grouping_labels[grouping_choice]
+        ranking = heavy_hitters.top(grouping, 10)
+        ranking['Estimate'] = ranking['Estimate'] / 1000
+        ranking['± Max Error'] = ranking['Max_Error'] / 1000
+        st.dataframe(
+            ranking[['Rank'] + list(grouping) + ['Estimate', '± Max Error', 'Guaranteed']]
+            .rename(columns={'Estimate': 'Spending (₹M)'}).set_index('Rank').round(2),
+            use_container_width=True
+        )
+        bounds = heavy_hitters.error_bounds(grouping)
+        st.caption(f"Space-Saving over-count ≤ ₹{bounds['space_saving']/1000:.1f}M for any key; "
+                   f"Count-Min ≤ ₹{bounds['count_min']/1000:.1f}M with {bounds['count_min_confidence']:.0%} confidence. "
+                   "'Guaranteed' marks keys certain to belong to the top 10.")
+
     elif analysis_type == "Demographic Analysis":
         st.header("👥 Demographic Spending Analysis")
 
         # Age group analysis
         st.subheader("Age Group Analysis")
-        age_data = filtered_detailed.groupby(['Age_Group', 'Date'])['Spending_Amount_Thousands_INR'].sum().reset_index()
 
-        fig = px.box(
-            filtered_detailed,
-            x='Age_Group',
-            y='Spending_Amount_Thousands_INR',
-            title="Spending Distribution by Age Group"
+        summarized_box = st.checkbox(
+            "Summarize distribution server-side",
+            value=True,
+            help="Send only quartiles, whiskers and a capped outlier sample instead of every row"
         )
+
+        if summarized_box:
+            box_stats, box_outliers = cached_aggregate(
+                'age_box_summary',
+                lambda: box_summary(filtered_detailed, 'Age_Group', 'Spending_Amount_Thousands_INR')
+            )
+            fig = cached_figure(
+                'age_box_summary',
+                (box_stats, box_outliers),
+                lambda: box_figure(
+                    box_stats,
+                    box_outliers,
+                    'Age_Group',
+                    'Spending_Amount_Thousands_INR',
+                    title="Spending Distribution by Age Group"
+                )
+            )
+        else:
+            fig = cached_figure(
+                'age_box_raw',
+                filtered_detailed[['Age_Group', 'Spending_Amount_Thousands_INR']],
+                lambda: px.box(
+                    filtered_detailed,
+                    x='Age_Group',
+                    y='Spending_Amount_Thousands_INR',
+                    title="Spending Distribution by Age Group"
+                )
+            )
         st.plotly_chart(fig, use_container_width=True)
 
+        # Percentiles from the quantile sketches (year granularity for the date range)
+        st.subheader("📏 Spending Percentiles")
+        sketch_filters = {dim: values for dim, values in segment_filters.items()}
+        if len(date_range) == 2:
+            sketch_filters['Year'] = list(range(date_range[0].year, date_range[1].year + 1))
+        percentile_by = st.radio("Percentiles by:", ['Age_Group', 'Gender', 'Card_Type'], horizontal=True)
+        percentiles = cached_aggregate(
+            'percentiles',
+            lambda: get_slice_sketches().percentile_table('Spending_Amount_Thousands_INR', percentile_by, **sketch_filters),
+            percentile_by
+        )
+        st.dataframe(percentiles.round(2), use_container_width=True)
+        st.caption(f"Approximate (±{get_slice_sketches().buckets.relative_accuracy:.0%}) quantiles of "
+                   "Spending_Amount_Thousands_INR for the selected segments and years")
+
         # Gender and Card Type analysis
         col1, col2 = st.columns(2)
 
         with col1:
-            gender_data = filtered_detailed.groupby('Gender')['Spending_Amount_Thousands_INR'].sum()
-            fig2 = px.pie(
-                values=gender_data.values,
-                names=gender_data.index,
-                title="Spending by Gender"
+            gender_data = spending_by('gender_data', 'Gender', segment_filters)
+            fig2 = cached_figure(
+                'gender_data',
+                gender_data['sum'],
+                lambda: px.pie(
+                    values=gender_data['sum'],
+                    names=gender_data.index,
+                    title="Spending by Gender"
+                )
             )
             st.plotly_chart(fig2, use_container_width=True)
+            if approximate:
+                st.caption(" | ".join(f"{gender}: {row['percentage']:.1f}% ±{row['percentage_ci']:.1f}"
+                                      for gender, row in gender_data.iterrows()))
 
         with col2:
-            card_data = filtered_detailed.groupby('Card_Type')['Spending_Amount_Thousands_INR'].sum()
-            fig3 = px.bar(
-                x=card_data.index,
-                y=card_data.values,
-                title="Spending by Card Type"
+            card_data = spending_by('card_data', 'Card_Type', segment_filters)
+            fig3 = cached_figure(
+                'card_data',
+                card_data[['sum', 'sum_ci']],
+                lambda: px.bar(
+                    x=card_data.index,
+                    y=card_data['sum'],
+                    error_y=card_data['sum_ci'] if approximate else None,
+                    title="Spending by Card Type"
+                ),
+                approximate=approximate
             )
             st.plotly_chart(fig3, use_container_width=True)
 
-    # Data export section
-    st.sidebar.header("📥 Data Export")
-    if st.sidebar.button("Download Main Dataset"):
-        csv = filtered_main.to_csv(index=False)
-        st.sidebar.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name="card_spending_main.csv",
-            mime="text/csv"
+        approximate_caption()
+
+    elif analysis_type == "Period Comparison":
+        st.header("⚖️ Period Comparison")
+        st.caption("Every period total is a difference of prefix sums per segment, so any two ranges compare in constant time.")
+
+        prefix_sums = get_prefix_sums(detailed_df)
+        first_date, last_date = prefix_sums.periods[0], prefix_sums.periods[-1]
+
+        # Default: the last twelve months of the selected range against the twelve months before,
+        # counted in calendar months so leap days never add or drop a month-end
+        end_month = pd.Period(filtered_main['Date'].max() if len(filtered_main) else last_date, 'M')
+        first_month = pd.Period(first_date, 'M')
+
+        def month_window(first, last):
+            first, last = max(first, first_month), max(last, first_month)
+            return max(first.start_time, first_date), last.end_time.normalize()
+
+        current_start, current_end = month_window(end_month - 11, end_month)
+        base_start, base_end = month_window(end_month - 23, end_month - 12)
+
+        period_col1, period_col2 = st.columns(2)
+        base_period = period_col1.date_input(
+            "Base period:", value=(base_start.date(), base_end.date()),
+            min_value=first_date.date(), max_value=last_date.date())
+        current_period = period_col2.date_input(
+            "Comparison period:", value=(current_start.date(), current_end.date()),
+            min_value=first_date.date(), max_value=last_date.date())
+        compare_measure = st.radio("Measure:", ['Spending_Amount_Thousands_INR', 'Transaction_Count'],
+                                   format_func=lambda m: m.replace('_', ' '), horizontal=True)
+
+        if len(base_period) == 2 and len(current_period) == 2:
+            periods_key = (tuple(map(str, base_period)), tuple(map(str, current_period)))
+            base_total = prefix_sums.totals(compare_measure, *base_period, filters=segment_filters)
+            current_total = prefix_sums.totals(compare_measure, *current_period, filters=segment_filters)
+
+            metric_col1, metric_col2, metric_col3 = st.columns(3)
+            metric_col1.metric("Base Period Total", f"{base_total:,.0f}")
+            metric_col2.metric("Comparison Period Total", f"{current_total:,.0f}")
+            metric_col3.metric("Change", f"{current_total - base_total:+,.0f}",
+                               f"{(current_total / base_total - 1) * 100:+.1f}%" if base_total else None)
+
+            compare_cols = st.columns(2)
+            for column, dim in zip(compare_cols, ['Category', 'City']):
+                comparison = cached_aggregate(
+                    f'compare_{dim}',
+                    lambda dim=dim: prefix_sums.compare(compare_measure, base_period, current_period, dim, segment_filters),
+                    compare_measure, periods_key
+                ).sort_values('Change')
+                with column:
+                    if comparison.empty:
+                        st.info(f"No {dim.lower()} data for the selected segments in either period.")
+                        continue
+                    fig = cached_figure(
+                        f'compare_{dim}',
+                        comparison,
+                        lambda comparison=comparison, dim=dim: px.bar(
+                            comparison.reset_index(),
+                            x='Change',
+                            y=dim,
+                            color=comparison['Change'].to_numpy() >= 0,
+                            color_discrete_map={True: '#2ca02c', False: '#d62728'},
+                            orientation='h',
+                            hover_data=['Base', 'Current', 'Change_Pct'],
+                            title=f"Change by {dim}"
+                        ).update_layout(showlegend=False)
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                    st.dataframe(comparison.sort_values('Change', ascending=False).round(1), use_container_width=True)
+        else:
+            st.info("Select a start and end date for both periods.")
+
+    elif analysis_type == "Drill-down Explorer":
+        st.header("🧭 Drill-down Explorer")
+        st.caption("City → Category → Age Group → Card Type for the selected date range. Every level is read from "
+                   "precomputed hierarchy aggregates; segment filters do not apply here.")
+
+        hierarchy = get_hierarchy(detailed_df)
+
+        # The breadcrumb path lives in the session and each node's view is cached by path,
+        # so going back up the hierarchy is a cache hit
+        drill_path = st.session_state.setdefault('drill_path', [])
+
+        def set_drill_path(path, choice_key=None):
+            if choice_key is not None:
+                path = path + [st.session_state[choice_key]]
+                st.session_state[choice_key] = None
+            st.session_state['drill_path'] = path
+
+        crumb_cols = st.columns(len(hierarchy.hierarchy) + 1)
+        for depth, label in enumerate(["All"] + drill_path):
+            crumb_cols[depth].button(
+                ("🏠 " if depth == 0 else "› ") + str(label),
+                key=f"drill_crumb_{depth}",
+                on_click=set_drill_path,
+                args=(drill_path[:depth],),
+                disabled=depth == len(drill_path),
+                use_container_width=True
+            )
+
+        node_path = tuple(drill_path)
+        node, parent, children = cached_aggregate(
+            'drill_node',
+            lambda: (hierarchy.node(node_path, *selected_range),
+                     hierarchy.node(node_path[:-1], *selected_range) if node_path else None,
+                     hierarchy.children(node_path, *selected_range)),
+            node_path
         )
 
-    if st.sidebar.button("Download Detailed Dataset"):
-        csv = filtered_detailed.to_csv(index=False) 
-        st.sidebar.download_button(
-            label="Download Detailed CSV",
-            data=csv,
-            file_name="card_spending_detailed.csv",
-            mime="text/csv"
+        metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
+        metric_col1.metric("Spending", f"₹{node[SPENDING]/1000:,.1f}M")
+        metric_col2.metric("Transactions", f"{node[TRANSACTIONS]:,.0f}")
+        metric_col3.metric("Avg Transaction", f"₹{node[SPENDING] * 1000 / node[TRANSACTIONS]:,.0f}" if node[TRANSACTIONS] else "N/A")
+        metric_col4.metric("Share of Parent", f"{node[SPENDING] / parent[SPENDING] * 100:.1f}%" if parent and parent[SPENDING] else "100%")
+
+        next_dim = hierarchy.next_dim(node_path)
+        if next_dim is None:
+            st.info("This is a leaf segment: there is no further level to drill into.")
+        elif children.empty:
+            st.info("No spending for this segment in the selected date range.")
+        else:
+            next_label = next_dim.replace('_', ' ')
+            chart_col, table_col = st.columns([3, 2])
+            with chart_col:
+                ranked = children.sort_values(SPENDING)
+                fig = cached_figure(
+                    'drill_children',
+                    ranked,
+                    lambda: px.bar(
+                        x=ranked[SPENDING] / 1000,
+                        y=ranked.index.astype(str),
+                        orientation='h',
+                        labels={'x': "Spending (₹M)", 'y': next_label},
+                        title=f"Spending by {next_label}" + (f" in {' › '.join(map(str, node_path))}" if node_path else "")
+                    ),
+                    path=node_path
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            with table_col:
+                st.dataframe(
+                    children.sort_values(SPENDING, ascending=False)
+                    .assign(**{SPENDING: children[SPENDING] / 1000})
+                    .rename(columns={SPENDING: 'Spending (₹M)', TRANSACTIONS: 'Transactions', 'Share': 'Share (%)'})
+                    .round(1),
+                    use_container_width=True
+                )
+
+            choice_key = f"drill_choice_{len(node_path)}"
+            st.selectbox(
+                f"Drill into {next_label}:",
+                children.index,
+                index=None,
+                placeholder=f"Choose a {next_label.lower()}...",
+                key=choice_key,
+                on_change=set_drill_path,
+                args=(drill_path, choice_key)
+            )
+
+        # Monthly trend of the current node
+        node_trend = cached_aggregate('drill_trend', lambda: hierarchy.trend(node_path, *selected_range), node_path)
+        trend_points = plot_points(node_trend, 'Date', SPENDING)
+        fig2 = cached_figure(
+            'drill_trend',
+            trend_points,
+            lambda: px.line(
+                trend_points,
+                x='Date',
+                y=SPENDING,
+                title="Monthly Spending" + (f" - {' › '.join(map(str, node_path))}" if node_path else ""),
+                markers=not use_webgl(len(trend_points))
+            ),
+            path=node_path
         )
+        st.plotly_chart(fig2, use_container_width=True)
+
+    elif analysis_type == "Pivot Explorer":
+        st.header("🧮 Pivot Explorer")
+        st.caption("Cross-tab any two dimensions, optionally split by a third. Cells are binned from the "
+                   "prefix-sum totals of every leaf segment, so a pivot costs the same whatever the row count.")
+
+        pivot_engine = get_pivot_engine(detailed_df)
+        dim_label = lambda dim: dim.replace('_', ' ')
+
+        pivot_col1, pivot_col2, pivot_col3 = st.columns(3)
+        pivot_rows = pivot_col1.selectbox("Rows:", pivot_engine.dims, index=pivot_engine.dims.index('Age_Group'),
+                                          format_func=dim_label)
+        column_options = [dim for dim in pivot_engine.dims if dim != pivot_rows]
+        pivot_columns = pivot_col2.selectbox("Columns:", column_options,
+                                             index=column_options.index('Card_Type') if 'Card_Type' in column_options else 0,
+                                             format_func=dim_label)
+        pivot_pages = pivot_col3.selectbox("Split by:", [None] + [dim for dim in column_options if dim != pivot_columns],
+                                           format_func=lambda dim: "None" if dim is None else dim_label(dim))
+
+        stat_col, measure_col, normalize_col = st.columns(3)
+        pivot_stat = stat_col.radio("Statistic:", PIVOT_STATS, format_func={
+            'sum': "Sum", 'mean': "Mean", 'share': "Share %", 'growth': "YoY Growth %"}.get, horizontal=True)
+        pivot_measure = measure_col.radio("Measure:", ['Spending_Amount_Thousands_INR', 'Transaction_Count'],
+                                          format_func=dim_label, horizontal=True)
+        pivot_normalize = normalize_col.radio(
+            "Share of:", NORMALIZE, format_func={'all': "Total", 'index': "Row", 'columns': "Column"}.get,
+            horizontal=True, disabled=pivot_stat != 'share')
+
+        pivot_key = (pivot_measure, pivot_rows, pivot_columns, pivot_pages, pivot_stat, pivot_normalize)
+        pivot_table = cached_aggregate(
+            'pivot',
+            lambda: pivot_engine.pivot(pivot_measure, pivot_rows, pivot_columns, pivot_pages, pivot_stat,
+                                       *selected_range, filters=segment_filters, normalize=pivot_normalize),
+            pivot_key
+        )
+
+        if pivot_table.empty:
+            st.info("No records for the selected segments and date range.")
+        else:
+            if pivot_stat == 'growth' and pivot_table.isna().all().all():
+                st.info("YoY growth needs a date range that starts at least a year after the first month of data.")
+
+            def build_pivot_heatmap():
+                title = f"{pivot_measure.replace('_', ' ')} - {pivot_stat.title()} by {dim_label(pivot_rows)} x {dim_label(pivot_columns)}"
+                heatmap_options = dict(
+                    text_auto='.1f',
+                    aspect='auto',
+                    color_continuous_scale='RdBu' if pivot_stat == 'growth' else 'Blues',
+                    color_continuous_midpoint=0 if pivot_stat == 'growth' else None,
+                    labels={'x': dim_label(pivot_columns), 'y': dim_label(pivot_rows), 'color': pivot_stat.title()}
+                )
+                if pivot_pages is None:
+                    return px.imshow(pivot_table, title=title, **heatmap_options)
+                pages = pivot_table.index.get_level_values(0).unique()
+                rows = pivot_table.index.get_level_values(1).unique()
+                cube = np.stack([pivot_table.loc[page].reindex(rows).to_numpy() for page in pages])
+                wrap = min(len(pages), 3)
+                fig = px.imshow(
+                    cube, x=pivot_table.columns.astype(str), y=rows.astype(str), facet_col=0, facet_col_wrap=wrap,
+                    title=f"{title} by {dim_label(pivot_pages)}", height=max(400, 60 + (len(rows) * 30 + 80) * -(-len(pages) // wrap)),
+                    **heatmap_options
+                )
+                # Facet titles read 'facet_col=<n>'; show the page value instead
+                fig.for_each_annotation(lambda a: a.update(text=str(pages[int(a.text.split('=')[1])])))
+                return fig
+
+            fig = cached_figure('pivot_heatmap', pivot_table, build_pivot_heatmap, key=pivot_key)
+            st.plotly_chart(fig, use_container_width=True)
+
+            with st.expander("📋 Pivot Table"):
+                st.dataframe(pivot_table.round(2), use_container_width=True)
+
+    elif analysis_type == "Advanced Analytics":
+        st.header("🧠 Advanced Analytics")
+        st.caption("Models are fitted in background worker processes; each view fills in when its job finishes.")
+
+        from jobs import anomaly_job, forecast_job, segmentation_job
+
+        background_jobs = get_background_jobs()
+        job_owner = st.session_state.setdefault('job_owner', uuid.uuid4().hex)
+        anomaly_level = st.radio("Anomaly segments:", ['Category', 'City', 'Category x City'], horizontal=True)
+        anomaly_dims = tuple(anomaly_level.split(' x '))
+
+        job_specs = {
+            'forecast': (forecast_job, ('card_spending_trends.csv', *selected_range), ()),
+            'segments': (segmentation_job, ('detailed_card_spending.csv', segment_filters, *selected_range), ()),
+            'anomalies': (anomaly_job, ('detailed_card_spending.csv', anomaly_dims, segment_filters, *selected_range), anomaly_dims),
+        }
+        job_keys = {}
+        for name, (job, args, extra_key) in job_specs.items():
+            job_keys[name] = (analysis_type, name) + filter_key + extra_key
+            background_jobs.submit(job_keys[name], job, *args, timeout=120, owner=job_owner)
+        # Jobs this session started for earlier filter states are no longer needed
+        background_jobs.cancel(job_owner, keep=job_keys.values())
+
+        def job_result(name, label):
+            """Finished result of a job, or None while a placeholder shows its progress"""
+            status = background_jobs.status(job_keys[name])
+            if status['state'] == 'done':
+                return status['result']
+            if status['state'] in ('failed', 'timeout'):
+                st.warning(f"{label}: {status['error']}")
+                if st.button("🔁 Retry", key=f"retry_{name}"):
+                    job, args, _ = job_specs[name]
+                    background_jobs.submit(job_keys[name], job, *args, timeout=120, owner=job_owner, retry=True)
+                    st.rerun()
+            else:
+                job_progress(job_keys[name], label)
+            return None
+
+        # Random Forest forecast
+        st.subheader("🔮 Spending Forecast")
+        forecast = job_result('forecast', "Random Forest forecast")
+        if forecast is not None:
+            metric_col1, metric_col2, metric_col3 = st.columns(3)
+            metric_col1.metric("MAE", f"₹{forecast['mae']:.1f}B")
+            metric_col2.metric("RMSE", f"₹{forecast['rmse']:.1f}B")
+            metric_col3.metric("R² Score", f"{forecast['r2']:.3f}")
+
+            actual_points = plot_points(filtered_main, 'Date', 'Total_Spending_Billion_INR')
+            actual_trace = go.Scattergl if use_webgl(len(actual_points)) else go.Scatter
+
+            def build_forecast_figure():
+                fig = go.Figure()
+                fig.add_trace(actual_trace(x=actual_points['Date'], y=actual_points['Total_Spending_Billion_INR'],
+                                           mode='lines', name='Actual'))
+                fig.add_trace(go.Scatter(x=forecast['test']['Date'], y=forecast['test']['Predicted'],
+                                         mode='lines+markers', name='Hold-out Prediction'))
+                fig.add_trace(go.Scatter(x=forecast['forecast']['Date'], y=forecast['forecast']['Forecast'],
+                                         mode='lines+markers', name='Forecast', line=dict(dash='dash')))
+                fig.update_layout(title="Total Spending Forecast (Billion INR)", height=450, hovermode='x unified')
+                return fig
+
+            fig = cached_figure(
+                'forecast',
+                (actual_points[['Date', 'Total_Spending_Billion_INR']], forecast['test'], forecast['forecast']),
+                build_forecast_figure
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        # K-means customer segments
+        st.subheader("🎯 Customer Segments")
+        segments = job_result('segments', "K-means segmentation")
+        if segments is not None:
+            segments = segments.assign(
+                Segment=segments['Age_Group'] + ' ' + segments['Gender'] + ' ' + segments['Card_Type'],
+                Cluster=segments['Cluster'].astype(str)
+            )
+            fig2 = cached_figure(
+                'segments',
+                segments,
+                lambda: px.scatter(
+                    segments,
+                    x='Transaction_Count_mean',
+                    y='Spending_Amount_Thousands_INR_mean',
+                    size='Spending_Amount_Thousands_INR_sum',
+                    color='Cluster',
+                    hover_name='Segment',
+                    title="Segments by Average Spending and Transactions"
+                )
+            )
+            st.plotly_chart(fig2, use_container_width=True)
+
+        # Residual anomalies from the seasonal decomposition
+        st.subheader("🚨 Spending Anomalies")
+        anomalies = job_result('anomalies', "Anomaly detection")
+        if anomalies is not None:
+            if anomalies.empty:
+                st.info("No anomalous months for the selected segments and range.")
+            else:
+                st.dataframe(anomalies.round(2), use_container_width=True)
+                st.caption("Months whose residual after trend and seasonality is a robust outlier (|z| > 3.5) within its series")
+
+    # Data export section: nothing is encoded until the download is clicked, then rows
+    # are written in chunks to a temporary file on a separate thread; the encoded file is
+    # read back once, since Streamlit serves the download from memory
+    st.sidebar.header("📥 Data Export")
+    with st.sidebar.expander("Export Options"):
+        export_dataset = st.radio("Dataset:", ["Main", "Detailed"], horizontal=True)
+        export_source = 'card_spending_trends.csv' if export_dataset == "Main" else 'detailed_card_spending.csv'
+        export_options = get_columns(export_source)
+        export_columns = st.multiselect("Columns:", export_options, default=export_options)
+        apply_filters = st.checkbox("Apply date range and segment filters", value=True)
+        export_format = st.selectbox("Format:", available_formats())
+
+    def export_data():
+        if export_dataset == "Detailed" and filtered_detailed is not None:
+            df = filtered_detailed if apply_filters else detailed_df
+        else:
+            df = get_shared_dataset(export_source)
+            if apply_filters:
+                df = get_date_index(export_dataset.lower(), df).slice(*selected_range)
+        return export_bytes(df, export_format, export_columns)
+
+    st.sidebar.download_button(
+        label=f"Download {export_dataset} Dataset",
+        data=export_data,
+        file_name=f"card_spending_{export_dataset.lower()}{EXPORT_FORMATS[export_format]['extension']}",
+        mime=EXPORT_FORMATS[export_format]['mime'],
+        on_click='ignore',
+        disabled=not export_columns
+    )
+
+    # Render timing (the first run of a session includes data loading and index builds)
+    render_ms = (time.perf_counter() - render_started) * 1000
+    first_render_ms = st.session_state.setdefault('first_render_ms', render_ms)
+    st.sidebar.caption(f"⏱️ First render {first_render_ms:,.0f} ms · this view {render_ms:,.0f} ms")
 
     # Footer
     st.markdown("---")
@@ -0,0 +1,81 @@
+"""
+Credit Card Spending Analysis - Pivot Engine Tests
+==================================================
+
+Run with ``python -m pytest -q test_pivot.py``.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import SeriesCube
+from indexes import PrefixSumIndex
+from pivot import PivotEngine
+
+MEASURE = 'Spending_Amount_Thousands_INR'
+
+
+@pytest.fixture
+def detailed_df():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2023-01-31', periods=26, freq='ME')
+    grid = pd.MultiIndex.from_product(
+        [dates, ['Travel', 'Fuel'], ['Mumbai', 'Pune'], ['18-25', '26-35'], ['Male', 'Female'], ['Gold', 'Silver']],
+        names=['Date', 'Category', 'City', 'Age_Group', 'Gender', 'Card_Type']
+    ).to_frame(index=False)
+    grid[MEASURE] = rng.uniform(1, 100, len(grid))
+    grid['Transaction_Count'] = rng.integers(1, 20, len(grid))
+    return grid
+
+
+@pytest.fixture
+def engine(detailed_df):
+    cube = SeriesCube.from_frame(detailed_df, sets=[('Category', 'City', 'Age_Group', 'Gender', 'Card_Type')])
+    return PivotEngine(PrefixSumIndex.from_cube(cube))
+
+
+def test_sum_matches_pivot_table(engine, detailed_df):
+    table = engine.pivot(MEASURE, 'Age_Group', 'Card_Type', pages='City', filters={'Gender': ['Female']})
+    expected = detailed_df[detailed_df['Gender'] == 'Female'].pivot_table(
+        index=['City', 'Age_Group'], columns='Card_Type', values=MEASURE, aggfunc='sum')
+    assert np.allclose(table.to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize('pages', [None, 'City'])
+@pytest.mark.parametrize('stat', ['sum', 'mean', 'share', 'growth'])
+def test_empty_selection_returns_empty_table(engine, pages, stat):
+    table = engine.pivot(MEASURE, 'Age_Group', 'Card_Type', pages=pages, stat=stat, filters={'Gender': []})
+    assert table.empty
+    assert table.columns.name == 'Card_Type'
+    assert list(table.index.names) == ([pages] if pages else []) + ['Age_Group']
+
+
+def test_date_window_without_data_returns_empty_table(engine):
+    table = engine.pivot(MEASURE, 'Age_Group', 'Card_Type', start='2023-03-05', end='2023-03-06')
+    assert table.empty
+
+
+@pytest.mark.parametrize('start, end', [
+    ('2024-03-01', '2025-02-28'),  # base window ends on the leap day
+    ('2024-02-01', '2024-12-31'),
+    ('2024-03-01', '2025-02-15'),  # February 2025 not yet complete
+])
+def test_growth_matches_pandas(engine, detailed_df, start, end):
+    table = engine.pivot(MEASURE, 'Age_Group', 'Card_Type', stat='growth', start=start, end=end)
+    months = detailed_df['Date'].dt.to_period('M')
+    current = detailed_df['Date'].between(start, end)
+    base = months.isin(months[current] - 12)
+
+    def totals(rows):
+        return detailed_df[rows].pivot_table(index='Age_Group', columns='Card_Type', values=MEASURE, aggfunc='sum')
+
+    expected = (totals(current) / totals(base) - 1) * 100
+    assert base.sum() == current.sum()
+    assert np.allclose(table.to_numpy(), expected.to_numpy())
+
+
+def test_growth_without_full_base_window_is_nan(engine):
+    table = engine.pivot(MEASURE, 'Age_Group', 'Card_Type', stat='growth', start='2023-06-01', end='2024-05-31')
+    assert table.shape == (2, 2)
+    assert table.isna().all().all()
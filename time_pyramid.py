@@ -0,0 +1,193 @@
+"""
+Credit Card Spending Analysis - Time Pyramid
+============================================
+
+Every measure of every slice pre-aggregated at four time resolutions: month,
+quarter, Indian financial year (April-March) and calendar year. Coarser levels
+are built from the monthly matrices of a SeriesCube with one ``reduceat`` per
+level, so a yearly or quarterly view reads a handful of cells instead of
+re-aggregating the finest grain. ``choose_level`` picks the coarsest level
+whose periods exactly tile a requested date range.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cube import MEASURES, SeriesCube, grouping_sets
+from store import cached_result, result_key
+
+# Finest to coarsest, with the pandas period frequency of each level
+LEVELS = ['Month', 'Quarter', 'Financial_Year', 'Year']
+LEVEL_FREQ = {'Month': 'M', 'Quarter': 'Q', 'Financial_Year': 'Y-MAR', 'Year': 'Y'}
+MONTHS_PER_PERIOD = {'Month': 1, 'Quarter': 3, 'Financial_Year': 12, 'Year': 12}
+PERIODS_PER_YEAR = {'Month': 12, 'Quarter': 4, 'Financial_Year': 1, 'Year': 1}
+
+# Aggregation of the main dataset's measures: flows are summed, stocks and ratios averaged
+MAIN_MEASURES = {
+    'Total_Spending_Billion_INR': 'sum',
+    'Active_Cards_Millions': 'mean',
+    'Avg_Monthly_Spend_INR': 'mean',
+}
+
+
+def period_labels(periods, level):
+    """Display labels: 2024 for years, 'FY2024-25' for financial years, '2024Q1', '2024-01'"""
+    if level == 'Year':
+        return pd.Index(periods.year)
+    if level == 'Financial_Year':
+        return pd.Index([f"FY{p.year - 1}-{p.year % 100:02d}" for p in periods])
+    return pd.Index(periods.astype(str))
+
+
+def is_aligned(start, end, level):
+    """True when [start, end] begins and ends on ``level`` period boundaries (month granularity)"""
+    freq = LEVEL_FREQ[level]
+    start_month, end_month = pd.Period(start, 'M'), pd.Period(end, 'M')
+    return (pd.Period(start, freq).asfreq('M', 'start') == start_month
+            and pd.Period(end, freq).asfreq('M', 'end') == end_month)
+
+
+class TimePyramid:
+    """(series x period) matrices of every measure at month, quarter, financial and calendar year"""
+
+    def __init__(self, keys, levels):
+        self.keys = keys.reset_index(drop=True)
+        self.levels = levels
+        self.dims = [col for col in keys.columns if col != 'Level']
+        self._positions = {
+            tuple(row): i for i, row in enumerate(self.keys[self.dims].to_numpy().tolist())
+        }
+
+    @classmethod
+    def from_monthly(cls, keys, months, values, how=None):
+        """Aggregate monthly (series x month) matrices into every level
+
+        ``how`` maps a measure to 'sum' (default) or 'mean'; means ignore
+        missing months.
+        """
+        how = how or {}
+        months = pd.DatetimeIndex(months)
+        levels = {}
+        for level in LEVELS:
+            periods = months.to_period(LEVEL_FREQ[level])
+            # Months are sorted, so each period is one contiguous run of columns
+            starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+            level_values = {}
+            for measure, monthly in values.items():
+                observed = ~np.isnan(monthly)
+                sums = np.add.reduceat(np.where(observed, monthly, 0.0), starts, axis=1)
+                if how.get(measure, 'sum') == 'mean':
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        sums = sums / np.add.reduceat(observed, starts, axis=1)
+                level_values[measure] = sums
+            levels[level] = {
+                'periods': periods[starts],
+                'months': np.diff(np.r_[starts, len(months)]),
+                'values': level_values,
+            }
+        return cls(keys, levels)
+
+    @classmethod
+    def from_cube(cls, cube):
+        """Pyramid of every slice of a cube; cube measures are additive"""
+        return cls.from_monthly(cube.keys, cube.periods, cube.values)
+
+    @classmethod
+    def from_frame(cls, df, measures=MAIN_MEASURES, date_col='Date'):
+        """Pyramid of a single monthly series per measure, e.g. the main dataset"""
+        monthly = df.groupby(df[date_col].dt.to_period('M'))[list(measures)].mean()
+        keys = pd.DataFrame({'Level': ['Total']})
+        values = {m: monthly[m].to_numpy(dtype=float)[np.newaxis, :] for m in measures}
+        return cls.from_monthly(keys, monthly.index.to_timestamp(how='end').normalize(), values, how=measures)
+
+    @property
+    def start(self):
+        return self.levels['Month']['periods'][0].to_timestamp(how='start')
+
+    @property
+    def end(self):
+        return self.levels['Month']['periods'][-1].to_timestamp(how='end').normalize()
+
+    def position(self, **slice_filter):
+        key = tuple(slice_filter.get(dim, 'All') for dim in self.dims)
+        if key not in self._positions:
+            raise KeyError(f"Slice not in time pyramid: {slice_filter}")
+        return self._positions[key]
+
+    def choose_level(self, start=None, end=None, min_periods=1):
+        """Coarsest level whose periods tile [start, end] with at least ``min_periods`` periods"""
+        start = self.start if start is None else pd.Timestamp(start)
+        end = self.end if end is None else pd.Timestamp(end)
+        for level in reversed(LEVELS):
+            if not is_aligned(start, end, level):
+                continue
+            periods = self.levels[level]['periods']
+            inside = (periods >= pd.Period(start, LEVEL_FREQ[level])) & (periods <= pd.Period(end, LEVEL_FREQ[level]))
+            if inside.sum() >= min_periods:
+                return level
+        return 'Month'
+
+    def _window(self, level, start=None, end=None):
+        """Boolean mask of the level's periods lying entirely inside [start, end]"""
+        periods = self.levels[level]['periods']
+        mask = np.ones(len(periods), dtype=bool)
+        if start is not None:
+            mask &= periods.asfreq('M', 'start') >= pd.Period(start, 'M')
+        if end is not None:
+            mask &= periods.asfreq('M', 'end') <= pd.Period(end, 'M')
+        return mask
+
+    def frame(self, level, measures=None, start=None, end=None, **slice_filter):
+        """One slice's measures per period of ``level`` within [start, end]
+
+        Columns: Period (label), Date (period end), Months (months with data)
+        and one column per measure.
+        """
+        data = self.levels[level]
+        mask = self._window(level, start, end)
+        i = self.position(**slice_filter)
+        periods = data['periods'][mask]
+        frame = pd.DataFrame({
+            'Period': period_labels(periods, level),
+            'Date': periods.to_timestamp(how='end').normalize(),
+            'Months': data['months'][mask],
+        })
+        for measure in measures or list(data['values']):
+            frame[measure] = data['values'][measure][i, mask]
+        return frame
+
+    def table(self, measure, level, by, start=None, end=None):
+        """Wide table of one measure: a row per period, a column per slice of dimension ``by``"""
+        data = self.levels[level]
+        mask = self._window(level, start, end)
+        rows = (self.keys['Level'] == by).to_numpy()
+        return pd.DataFrame(
+            data['values'][measure][np.ix_(rows, mask)].T,
+            index=period_labels(data['periods'][mask], level),
+            columns=pd.Index(self.keys.loc[rows, by], name=by)
+        )
+
+    def growth(self, measure, level, start=None, end=None, **slice_filter):
+        """Percentage growth against the same period one year earlier, per period of ``level``
+
+        Growth is NaN where either period is only partly covered by the data.
+        """
+        data = self.levels[level]
+        values = data['values'][measure][self.position(**slice_filter)]
+        values = np.where(data['months'] == MONTHS_PER_PERIOD[level], values, np.nan)
+        lag = PERIODS_PER_YEAR[level]
+        growth = np.full(len(values), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth[lag:] = (values[lag:] / values[:-lag] - 1) * 100
+        growth[~np.isfinite(growth)] = np.nan
+        return growth[self._window(level, start, end)]
+
+
+def load_time_pyramid(detailed_df, source_path, measures=MEASURES, max_depth=1):
+    """Persisted pyramid of every slice up to ``max_depth`` dimensions"""
+    sets = grouping_sets(max_depth=max_depth)
+
+    def compute():
+        return TimePyramid.from_cube(SeriesCube.from_frame(detailed_df, sets=sets, measures=measures))
+
+    return cached_result(result_key('time_pyramid', tuple(measures), sets), [source_path], compute)
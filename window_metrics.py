@@ -0,0 +1,133 @@
+"""
+Credit Card Spending Analysis - Window Metrics
+=============================================
+
+MoM/YoY growth, rolling means and sums and year-to-date totals for every slice
+of the detailed dataset. All metrics are computed on the (series x month)
+matrices of a SeriesCube with shifted-array and cumulative-sum arithmetic, so
+the cost does not depend on the number of groups.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cube import DIMENSIONS, MEASURES, SeriesCube, grouping_sets
+from store import cached_result, result_key
+
+ROLLING_WINDOWS = (3, 6, 12)
+
+
+def monthly_grid(cube, measure):
+    """Place a cube measure on a gap-free monthly grid, filling missing months with 0"""
+    ordinals = cube.periods.year * 12 + cube.periods.month - 1
+    first, last = ordinals.min(), ordinals.max()
+    months = pd.period_range(
+        pd.Period(year=first // 12, month=first % 12 + 1, freq='M'),
+        periods=last - first + 1, freq='M'
+    )
+    values = np.zeros((len(cube.keys), len(months)))
+    values[:, np.asarray(ordinals - first)] = cube.values[measure]
+    return months.to_timestamp(how='end').normalize(), values
+
+
+def lagged_growth(values, lag):
+    """Percentage growth against ``lag`` periods earlier, NaN where undefined"""
+    growth = np.full(values.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth[:, lag:] = (values[:, lag:] / values[:, :-lag] - 1) * 100
+    growth[~np.isfinite(growth)] = np.nan
+    return growth
+
+
+def rolling_sum(values, window):
+    """Trailing rolling sum over the time axis, NaN until the window is full"""
+    cumulative = np.cumsum(values, axis=1)
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] < window:
+        return result
+    result[:, window - 1] = cumulative[:, window - 1]
+    result[:, window:] = cumulative[:, window:] - cumulative[:, :-window]
+    return result
+
+
+def year_to_date(values, periods):
+    """Cumulative total since the start of each calendar year"""
+    cumulative = np.cumsum(values, axis=1)
+    year_start = np.searchsorted(periods.year, periods.year, side='left')
+    before_start = np.where(year_start > 0, cumulative[:, year_start - 1], 0.0)
+    return cumulative - before_start
+
+
+class WindowMetrics:
+    """Growth, rolling and YTD metrics for every slice of a cube"""
+
+    def __init__(self, keys, periods, metrics):
+        self.keys = keys
+        self.periods = pd.DatetimeIndex(periods)
+        self.metrics = metrics
+        self.dims = [col for col in keys.columns if col != 'Level']
+        self._positions = {
+            tuple(row): i for i, row in enumerate(keys[self.dims].itertuples(index=False))
+        }
+
+    @classmethod
+    def from_cube(cls, cube, measures=None, windows=ROLLING_WINDOWS):
+        """Compute every window metric for every series of ``cube``"""
+        metrics = {}
+        periods = None
+        for measure in measures or list(cube.values):
+            periods, values = monthly_grid(cube, measure)
+            metrics[(measure, 'Value')] = values
+            metrics[(measure, 'MoM_Growth')] = lagged_growth(values, 1)
+            metrics[(measure, 'YoY_Growth')] = lagged_growth(values, 12)
+            for window in windows:
+                sums = rolling_sum(values, window)
+                metrics[(measure, f'Rolling_Sum_{window}')] = sums
+                metrics[(measure, f'Rolling_Mean_{window}')] = sums / window
+            metrics[(measure, 'YTD')] = year_to_date(values, periods)
+        return cls(cube.keys, periods, metrics)
+
+    def position(self, **slice_filter):
+        key = tuple(slice_filter.get(dim, 'All') for dim in self.dims)
+        if key not in self._positions:
+            raise KeyError(f"Slice not in window metrics: {slice_filter}")
+        return self._positions[key]
+
+    def slice_frame(self, measure, **slice_filter):
+        """All metrics of one measure for one slice, indexed by month"""
+        i = self.position(**slice_filter)
+        return pd.DataFrame({
+            name: values[i] for (m, name), values in self.metrics.items() if m == measure
+        }, index=self.periods)
+
+    def snapshot(self, measure, date=None, level=None):
+        """Metrics of every slice at one month (default: the latest)"""
+        t = len(self.periods) - 1 if date is None else self.periods.get_loc(pd.Timestamp(date))
+        frame = self.keys.copy()
+        for (m, name), values in self.metrics.items():
+            if m == measure:
+                frame[name] = values[:, t]
+        if level is not None:
+            frame = frame[frame['Level'] == level]
+        return frame
+
+    def to_frame(self, measure):
+        """Long-format table of every slice, month and metric of one measure"""
+        n_series, n_periods = len(self.keys), len(self.periods)
+        frame = self.keys.loc[np.repeat(np.arange(n_series), n_periods)].reset_index(drop=True)
+        frame['Date'] = np.tile(self.periods, n_series)
+        for (m, name), values in self.metrics.items():
+            if m == measure:
+                frame[name] = values.ravel()
+        return frame
+
+
+def load_window_metrics(detailed_df, source_path, measures=MEASURES, max_depth=len(DIMENSIONS)):
+    """Persisted window metrics for every slice up to ``max_depth`` dimensions"""
+    sets = grouping_sets(max_depth=max_depth)
+
+    def compute():
+        cube = SeriesCube.from_frame(detailed_df, sets=sets, measures=measures)
+        return WindowMetrics.from_cube(cube)
+
+    return cached_result(result_key('window_metrics', tuple(measures), sets), [source_path], compute)